@@ -12,3 +12,29 @@ __version__ = "0.4.0"
 __author__ = "Doug Blanding, Jelle Feringa, Thomas Paviot, Guillaume Florent"
 __author_email__ = "jelleferinga@gmail.com"
 __license__ = 'GPL v3'
+
+# Facade : the importers, exporters and helpers are available from the package itself
+# (e.g. OCCDataExchange.StepImporter), their module is only imported on first access (Python >= 3.7)
+_facade = {"BrepImporter": "brep", "BrepExporter": "brep",
+           "DatImporter": "dat",
+           "IgesImporter": "iges", "IgesExporter": "iges",
+           "StepImporter": "step", "StepExporter": "step",
+           "StepOcafImporter": "step_ocaf", "StepOcafExporter": "step_ocaf",
+           "StlImporter": "stl", "StlExporter": "stl",
+           "scan_iges": "scan", "scan_step": "scan",
+           "file_to_shape": "utils", "files_to_shapes": "utils", "shape_to_file": "utils"}
+
+__all__ = sorted(_facade)
+
+
+def __getattr__(name):
+    if name not in _facade:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module("%s.%s" % (__name__, _facade[name])), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
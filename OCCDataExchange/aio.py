@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""aio module of OCCDataExchange
+
+Summary
+-------
+
+asyncio API for imports and exports (Python >= 3.7).
+
+The conversions run in an executor so that they do not block the event loop :
+
+- a process pool (the default) : the shapes are sent between the processes serialized by
+  brep.shape_to_bytes(), the (de)serialization runs in a thread of the event loop default executor.
+- a thread pool (concurrent.futures.ThreadPoolExecutor) : the shapes are returned / passed as they are.
+  pythonocc does not release the GIL during OCC calls, the event loop is then blocked for most of the
+  conversion : only use a thread pool where the responsiveness of the event loop does not matter.
+
+The number of conversions running at the same time is bounded by a per event loop semaphore. A slot is held
+until the executor job completes, including a job that outlives the timeout or cancellation of its coroutine.
+The (de)serialization of the shapes does not hold a slot, but it counts in the timeout of the conversion.
+
+Cancellation
+------------
+Cancelling aimport_file() / aexport_shapes() (directly or through their timeout) cancels a conversion that is
+still waiting for the semaphore or for an executor worker. A conversion already running in a worker cannot be
+interrupted : its result is discarded and, for an export, the written file is removed.
+
+Usage
+-----
+
+shapes = await aimport_file("model.stp")
+await aexport_shapes(shapes, "model.igs", timeout=60)
+
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import weakref
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+_executor = None
+_owns_executor = False  # True if _executor is the process pool created by _get_executor()
+_max_concurrency = DEFAULT_MAX_CONCURRENCY
+_semaphores = weakref.WeakKeyDictionary()  # event loop -> semaphore
+
+
+def configure(executor=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    r"""Set the default executor and concurrency limit of aimport_file() and aexport_shapes()
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor (optional)
+        The default (None) is a process pool of max_concurrency workers created on first use.
+        The process pool previously created by default is shut down, an executor passed by the caller is not.
+    max_concurrency : int (optional)
+        Maximum number of conversions running at the same time in an event loop. The default is 4.
+
+    """
+    global _executor, _owns_executor, _max_concurrency
+    if max_concurrency < 1:
+        msg = "max_concurrency should be at least 1, got %i" % max_concurrency
+        logger.error(msg)
+        raise ValueError(msg)
+    if _owns_executor and _executor is not executor:
+        # the running jobs complete, the worker processes exit afterwards
+        _executor.shutdown(wait=False)
+    _executor = executor
+    _owns_executor = False
+    _max_concurrency = max_concurrency
+    _semaphores.clear()
+
+
+def _get_executor(executor):
+    global _executor, _owns_executor
+    if executor is not None:
+        return executor
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers=_max_concurrency)
+        _owns_executor = True
+    return _executor
+
+
+def _semaphore():
+    r"""Concurrency limiter of the running event loop"""
+    loop = asyncio.get_event_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_max_concurrency)
+    return semaphore
+
+
+def _serialize(shapes):
+    r"""Shapes to BREP bytes, run in a thread of the default executor of the event loop"""
+    from OCCDataExchange.brep import shape_to_bytes
+
+    return [shape_to_bytes(shape) for shape in shapes]
+
+
+def _deserialize(data):
+    r"""BREP bytes to shapes, run in a thread of the default executor of the event loop"""
+    from OCCDataExchange.brep import shape_from_bytes
+
+    return [shape_from_bytes(d) for d in data]
+
+
+def _import_serialized(pth):
+    r"""Process pool worker of aimport_file(), shapes cannot be pickled"""
+    from OCCDataExchange.brep import shape_to_bytes
+    from OCCDataExchange.utils import _read_shapes
+
+    return [shape_to_bytes(shape) for shape in _read_shapes(pth)]
+
+
+def _export_serialized(data, pth):
+    r"""Process pool worker of aexport_shapes(), shapes cannot be pickled"""
+    from OCCDataExchange.brep import shape_from_bytes
+    from OCCDataExchange.utils import _write_shapes
+
+    _write_shapes([shape_from_bytes(d) for d in data], pth)
+
+
+def _release_slot(loop, semaphore):
+    r"""Done callback of an executor job, releases its slot in the event loop thread"""
+    def _callback(future):
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:  # the event loop is closed
+            pass
+    return _callback
+
+
+def _remove_output(pth):
+    r"""Callback removing the file written by a cancelled export"""
+    def _callback(future):
+        if not future.cancelled() and future.exception() is None and os.path.isfile(pth):
+            logger.info("Removing %s written by a cancelled export" % pth)
+            os.remove(pth)
+    return _callback
+
+
+async def _run(executor, timeout, on_cancel, fn, *args):
+    r"""Run fn(*args) in the executor, within the concurrency limit
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+    timeout : float or None
+        Seconds, asyncio.TimeoutError is raised (and the conversion cancelled) when exceeded
+    on_cancel : callable or None
+        Added as a done callback to a conversion that was already running when cancelled
+    fn : callable
+
+    """
+    async def _limited():
+        semaphore = _semaphore()
+        await semaphore.acquire()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        # the slot is released when the job completes rather than when the coroutine ends,
+        # a job that cannot be interrupted still counts in the concurrency limit
+        future.add_done_callback(_release_slot(asyncio.get_event_loop(), semaphore))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel() and on_cancel is not None:
+                future.add_done_callback(on_cancel)
+            raise
+
+    return await asyncio.wait_for(_limited(), timeout)
+
+
+async def aimport_file(pth, executor=None, timeout=None):
+    r"""Import the shapes of a .iges, .igs, .stp, .step, .brep or .stl file without blocking the event loop
+
+    Parameters
+    ----------
+    pth : str
+    executor : concurrent.futures.Executor (optional)
+        The default (None) is the executor set by configure()
+    timeout : float (optional)
+        Seconds, the default (None) waits forever. The timeout covers the whole import, including the
+        deserialization of the shapes returned by a process pool.
+
+    Returns
+    -------
+    list[TopoDS.TopoDS_Shape]
+
+    Raises
+    ------
+    asyncio.TimeoutError
+        if the import takes more than timeout seconds
+
+    """
+    from OCCDataExchange.utils import _read_shapes
+
+    executor = _get_executor(executor)
+    logger.info("Importing %s asynchronously" % pth)
+
+    async def _import():
+        if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            data = await _run(executor, None, None, _import_serialized, pth)
+            return await asyncio.get_event_loop().run_in_executor(None, _deserialize, data)
+        return await _run(executor, None, None, _read_shapes, pth)
+
+    return await asyncio.wait_for(_import(), timeout)
+
+
+async def aexport_shapes(shapes, pth, executor=None, timeout=None):
+    r"""Export shapes to a .iges, .igs, .stp, .step, .brep or .stl file without blocking the event loop
+
+    STEP and IGES files get one root per shape, BREP and STL files get a compound of the shapes.
+
+    Parameters
+    ----------
+    shapes : list[TopoDS.TopoDS_Shape]
+    pth : str
+    executor : concurrent.futures.Executor (optional)
+        The default (None) is the executor set by configure()
+    timeout : float (optional)
+        Seconds, the default (None) waits forever. The timeout covers the whole export, including the
+        serialization of the shapes sent to a process pool.
+
+    Raises
+    ------
+    asyncio.TimeoutError
+        if the export takes more than timeout seconds
+
+    """
+    from OCCDataExchange.utils import _write_shapes
+
+    executor = _get_executor(executor)
+    logger.info("Exporting %i shape(s) to %s asynchronously" % (len(shapes), pth))
+    shapes = list(shapes)
+
+    async def _export():
+        if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            data = await asyncio.get_event_loop().run_in_executor(None, _serialize, shapes)
+            await _run(executor, None, _remove_output(pth), _export_serialized, data, pth)
+        else:
+            await _run(executor, None, _remove_output(pth), _write_shapes, shapes, pth)
+
+    await asyncio.wait_for(_export(), timeout)
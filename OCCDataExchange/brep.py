@@ -6,17 +6,23 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import logging
-
-from OCC import BRep
-from OCC import BRepTools
-from OCC import Message
-from OCC import TopoDS
+import os
+import tempfile
+import zlib
 
 from OCCDataExchange.checks import check_importer_filename, check_exporter_filename, check_shape, check_overwrite
 from OCCDataExchange.extensions import brep_extensions
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.stats import ConversionStats
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+BRep = lazy_import("OCC.BRep")
+BRepTools = lazy_import("OCC.BRepTools")
+Message = lazy_import("OCC.Message")
+TopoDS = lazy_import("OCC.TopoDS")
+
 
 class BrepImporter(object):
     r"""Brep importer
@@ -24,29 +30,46 @@ class BrepImporter(object):
     Parameters
     ----------
     filename : str
+    lazy : bool (optional)
+        If True, only the filename is checked at instantiation and the file is read
+        on first access to the results. The default is False (read at instantiation).
 
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, lazy=False):
         logger.info("BrepImporter instantiated with filename : %s" % filename)
 
         check_importer_filename(filename, brep_extensions)
         self._filename = filename
         self._shape = None
+        self._is_read = False
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+
+        if not lazy:
+            self._ensure_read()
 
-        logger.info("Reading file ....")
-        self.read_file()
+    def _ensure_read(self):
+        r"""Read the file if it has not been read yet"""
+        if not self._is_read:
+            logger.info("Reading file ....")
+            self.read_file()
 
     def read_file(self):
         r"""Read the BREP file and stores the result in a TopoDS_Shape"""
         shape = TopoDS.TopoDS_Shape()
         builder = BRep.BRep_Builder()
-        BRepTools.breptools_Read(shape, self._filename, builder)
+        with self.stats.phase("read"):
+            BRepTools.breptools_Read(shape, self._filename, builder)
+        self.stats.count("bytes_read", os.path.getsize(self._filename))
+        self.stats.count("shapes", 0 if shape.IsNull() else 1)
         self._shape = shape
+        self.stats.report()
+        self._is_read = True
 
     @property
     def shape(self):
         r"""Shape"""
+        self._ensure_read()
         if self._shape.IsNull():
             raise AssertionError("Error: the shape is NULL")
         else:
@@ -68,6 +91,7 @@ class BrepExporter(object):
 
         self._shape = None  # only one shape can be exported
         self._filename = filename
+        self.stats = ConversionStats(self.__class__.__name__, filename)
 
     def set_shape(self, a_shape):
         """
@@ -85,5 +109,64 @@ class BrepExporter(object):
         r"""Write file"""
         logger.info("Writing brep : {cad_file}".format(cad_file=self._filename))
         builder = Message.Handle_Message_ProgressIndicator()
-        BRepTools.breptools_Write(self._shape, self._filename, builder)
+        with self.stats.phase("write"):
+            BRepTools.breptools_Write(self._shape, self._filename, builder)
         logger.info("Wrote BREP file")
+        self.stats.count("shapes")
+        self.stats.count("bytes_written", os.path.getsize(self._filename))
+        self.stats.report()
+
+
+def shape_to_bytes(a_shape):
+    r"""Serialize a shape to a compact binary string
+
+    The shape is written in the BREP format and zlib compressed, which makes it
+    suitable to be shipped between processes or stored on disk.
+
+    Parameters
+    ----------
+    a_shape : TopoDS_Shape or subclass
+
+    Returns
+    -------
+    bytes
+
+    """
+    check_shape(a_shape)  # raises an exception if the shape is not valid
+    fd, tmp_filename = tempfile.mkstemp(suffix=".brep")
+    os.close(fd)
+    try:
+        BRepTools.breptools_Write(a_shape, tmp_filename, Message.Handle_Message_ProgressIndicator())
+        with open(tmp_filename, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(tmp_filename)
+    return zlib.compress(data)
+
+
+def shape_from_bytes(data):
+    r"""Rebuild a shape from a string created by shape_to_bytes()
+
+    Parameters
+    ----------
+    data : bytes
+
+    Returns
+    -------
+    TopoDS.TopoDS_Shape
+
+    """
+    fd, tmp_filename = tempfile.mkstemp(suffix=".brep")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.decompress(data))
+        shape = TopoDS.TopoDS_Shape()
+        builder = BRep.BRep_Builder()
+        BRepTools.breptools_Read(shape, tmp_filename, builder)
+    finally:
+        os.remove(tmp_filename)
+    if shape.IsNull():
+        msg = "Could not rebuild a shape from the serialized data"
+        logger.error(msg)
+        raise ValueError(msg)
+    return shape
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""cache module of OCCDataExchange
+
+Summary
+-------
+
+On-disk cache of the shapes translated from STEP and IGES files (ShapeCache).
+
+Entries are addressed by a hash of the input file content and of the translation parameters (including the
+OCC version and the Interface_Static read parameters of the importer), the shapes are stored as compressed
+BREP (see brep.shape_to_bytes()). The total size of the cache is bounded, the least recently used entries
+are evicted first.
+
+In-memory cache of shape triangulations (TessellationCache), shared by STL exports of the same shapes.
+
+"""
+
+from __future__ import print_function
+
+import collections
+import hashlib
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# os.replace() overwrites an existing entry on Windows too (Python >= 3.3)
+_replace = getattr(os, "replace", os.rename)
+
+_HEADER = struct.Struct(">QI")  # size of the source file, number of shapes
+_LENGTH = struct.Struct(">I")  # size of a serialized shape
+_SUFFIX = ".shapes"
+
+# Interface_Static parameters changing the shapes translated by the importers
+_READ_PARAMETERS = ["read.precision.mode", "read.precision.val", "read.maxprecision.mode", "read.maxprecision.val",
+                    "read.stdsameparameter.mode", "read.surfacecurve.mode", "read.encoderegularity.angle",
+                    "xstep.cascade.unit"]
+_IMPORTER_READ_PARAMETERS = {"step": ["read.step.product.mode", "read.step.product.context", "read.step.shape.repr",
+                                      "read.step.assembly.level", "read.step.shape.relationship",
+                                      "read.step.shape.aspect"],
+                             "iges": ["read.iges.bspline.continuity", "read.iges.onlyvisible"]}
+
+
+def read_settings(importer):
+    r"""OCC version and Interface_Static read parameters of an importer
+
+    Parameters
+    ----------
+    importer : str
+        "step" or "iges"
+
+    Returns
+    -------
+    tuple
+        Part of the cache keys of the files translated by the importer
+
+    """
+    import OCC
+    from OCC import Interface
+
+    # the parameters of a format are only defined once its controller is initialized
+    if importer == "step":
+        from OCC import STEPControl
+        STEPControl.STEPControl_Controller().Init()
+    elif importer == "iges":
+        from OCC import IGESControl
+        IGESControl.IGESControl_Controller().Init()
+    names = _READ_PARAMETERS + _IMPORTER_READ_PARAMETERS.get(importer, list())
+    parameters = tuple((name, Interface.Interface_Static_CVal(name)) for name in names
+                       if Interface.Interface_Static_IsPresent(name))
+    return getattr(OCC, "VERSION", None), parameters
+
+
+class ShapeCache(object):
+    r"""Content addressed on-disk cache of translated shapes
+
+    Parameters
+    ----------
+    directory : str
+        Directory where the cache entries are stored, created if it does not exist
+    max_size : int (optional)
+        Maximum total size of the cache entries, in bytes. The default is 512 Mb.
+
+    """
+
+    def __init__(self, directory, max_size=512 * 1024 ** 2):
+        logger.info("ShapeCache instantiated with directory : %s" % directory)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)  # may raise OSError
+        self._directory = directory
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+        self._bytes_saved = 0
+
+    @staticmethod
+    def key(filename, **params):
+        r"""Build the cache key of a file translated with a set of parameters
+
+        Parameters
+        ----------
+        filename : str
+            Path to the file to translate
+        params : dict
+            Translation parameters, their repr() must be stable between runs. If an importer ("step" or "iges")
+            is given, its read_settings() are added to the parameters.
+
+        Returns
+        -------
+        str
+
+        """
+        sha = hashlib.sha1()
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        if params.get("importer") in _IMPORTER_READ_PARAMETERS:
+            params["occ"] = read_settings(params["importer"])
+        for name in sorted(params):
+            sha.update(("%s=%r;" % (name, params[name])).encode("utf-8"))
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + _SUFFIX)
+
+    def get(self, key):
+        r"""Shapes stored under key
+
+        Parameters
+        ----------
+        key : str
+
+        Returns
+        -------
+        list[TopoDS.TopoDS_Shape] or None
+            None if the key is not in the cache
+
+        """
+        from OCCDataExchange.brep import shape_from_bytes
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except IOError:
+            self._misses += 1
+            logger.debug("Cache miss : %s" % key)
+            return None
+
+        try:
+            source_size, nb_shapes = _HEADER.unpack_from(data)
+            offset = _HEADER.size
+            shapes = list()
+            for _ in range(nb_shapes):
+                length, = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                if offset + length > len(data):
+                    raise ValueError("truncated entry")
+                shapes.append(shape_from_bytes(data[offset:offset + length]))
+                offset += length
+        except (struct.error, zlib.error, ValueError) as e:
+            # truncated or corrupt entry, it is removed and the file translated again
+            self._misses += 1
+            logger.warning("Corrupt cache entry %s (%s), ignored" % (key, e))
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        os.utime(path, None)  # the modification time is the LRU ordering
+        self._hits += 1
+        self._bytes_saved += source_size
+        logger.debug("Cache hit : %s" % key)
+        return shapes
+
+    def put(self, key, shapes, source_size=0):
+        r"""Store shapes under key and evict the least recently used entries if the cache is too big
+
+        Parameters
+        ----------
+        key : str
+        shapes : list[TopoDS.TopoDS_Shape]
+        source_size : int (optional)
+            Size of the translated file, in bytes, used for the bytes saved statistic
+
+        """
+        from OCCDataExchange.brep import shape_to_bytes
+
+        chunks = [_HEADER.pack(source_size, len(shapes))]
+        for shape in shapes:
+            data = shape_to_bytes(shape)
+            chunks.append(_LENGTH.pack(len(data)))
+            chunks.append(data)
+
+        # write to a temporary file first so that a concurrent reader never sees a partial entry
+        path = self._path(key)
+        tmp_path = "%s.%i.tmp" % (path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(chunks))
+        _replace(tmp_path, path)
+        logger.debug("Cache put : %s" % key)
+        self._evict()
+
+    def _entries(self):
+        r"""Cache entries as (modification time, size, path), least recently used first"""
+        entries = list()
+        for name in os.listdir(self._directory):
+            if name.endswith(_SUFFIX):
+                path = os.path.join(self._directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:  # removed by another process
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def _evict(self):
+        r"""Remove the least recently used entries until the cache fits in max_size"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            logger.info("Evicted %s from the cache" % path)
+
+    def clear(self):
+        r"""Remove all the entries of the cache"""
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    @property
+    def size(self):
+        r"""Total size of the cache entries, in bytes"""
+        return sum(size for _, size, _ in self._entries())
+
+    @property
+    def stats(self):
+        r"""Cache statistics
+
+        Returns
+        -------
+        dict
+            hits, misses, bytes_saved (size of the files whose translation was avoided),
+            entries and size (in bytes) of the cache
+
+        """
+        entries = self._entries()
+        return {"hits": self._hits,
+                "misses": self._misses,
+                "bytes_saved": self._bytes_saved,
+                "entries": len(entries),
+                "size": sum(size for _, size, _ in entries)}
+
+
+class TessellationCache(object):
+    r"""In-memory LRU cache of shape triangulations
+
+    Entries are keyed by shape identity (same TShape, location and orientation) and deflection.
+    A cache instance can be shared by any number of exporters.
+
+    Parameters
+    ----------
+    max_size : int (optional)
+        Maximum total size of the cached arrays, in bytes. The default is 256 Mb.
+
+    """
+
+    # HashCode() upper bound
+    _hash_upper = 2147483647
+
+    def __init__(self, max_size=256 * 1024 ** 2):
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()  # key -> (shape, vertices, faces), least recently used first
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    def _key(self, a_shape, deflection):
+        return a_shape.HashCode(self._hash_upper), float(deflection)
+
+    def get(self, a_shape, deflection):
+        r"""Triangulation of a shape
+
+        Parameters
+        ----------
+        a_shape : TopoDS_Shape or subclass
+        deflection : float
+
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray) or None
+            (vertices, faces), None if the triangulation is not in the cache
+
+        """
+        key = self._key(a_shape, deflection)
+        entry = self._entries.get(key)
+        # HashCode() collisions are possible, the shape itself tells if this is the right entry
+        if entry is None or not entry[0].IsEqual(a_shape):
+            self._misses += 1
+            return None
+        # move the entry to the most recently used end
+        del self._entries[key]
+        self._entries[key] = entry
+        self._hits += 1
+        return entry[1], entry[2]
+
+    def put(self, a_shape, deflection, vertices, faces):
+        r"""Store the triangulation of a shape
+
+        Parameters
+        ----------
+        a_shape : TopoDS_Shape or subclass
+        deflection : float
+        vertices : numpy.ndarray
+        faces : numpy.ndarray
+
+        """
+        key = self._key(a_shape, deflection)
+        if key in self._entries:
+            _, old_vertices, old_faces = self._entries.pop(key)
+            self._size -= old_vertices.nbytes + old_faces.nbytes
+        self._entries[key] = (a_shape, vertices, faces)
+        self._size += vertices.nbytes + faces.nbytes
+
+        while self._size > self._max_size and self._entries:
+            _, (_, old_vertices, old_faces) = self._entries.popitem(last=False)
+            self._size -= old_vertices.nbytes + old_faces.nbytes
+            logger.debug("Evicted a triangulation from the tessellation cache")
+
+    def triangulation(self, a_shape, deflection):
+        r"""Triangulation of a shape, computed by stl.shape_triangulation() on a cache miss
+
+        Parameters
+        ----------
+        a_shape : TopoDS_Shape or subclass
+        deflection : float
+
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray)
+            (vertices, faces)
+
+        """
+        from OCCDataExchange.stl import shape_triangulation
+
+        cached = self.get(a_shape, deflection)
+        if cached is not None:
+            return cached
+        vertices, faces = shape_triangulation(a_shape, deflection)
+        self.put(a_shape, deflection, vertices, faces)
+        return vertices, faces
+
+    def clear(self):
+        r"""Remove all the entries of the cache"""
+        self._entries.clear()
+        self._size = 0
+
+    @property
+    def stats(self):
+        r"""Cache statistics
+
+        Returns
+        -------
+        dict
+            hits, misses, hit_rate, entries and size (in bytes) of the cache
+
+        """
+        lookups = self._hits + self._misses
+        return {"hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": float(self._hits) / lookups if lookups else 0.,
+                "entries": len(self._entries),
+                "size": self._size}
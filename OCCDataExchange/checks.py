@@ -7,11 +7,14 @@ import logging
 import os.path
 import warnings
 
-from OCC import TopoDS
+from OCCDataExchange.lazy import lazy_import
 from OCCDataExchange.utils import extract_file_extension
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+TopoDS = lazy_import("OCC.TopoDS")
+
 
 def check_importer_filename(filename, allowed_extensions="*"):
     r"""Check the filename is ok for importing.
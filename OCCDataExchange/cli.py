@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""Command line interface of OCCDataExchange
+
+Usage
+-----
+
+occdx convert in_dir out_dir --to step --workers 8
+occdx convert in_dir out_dir --to stl --check hash
+
+The files of the in_dir tree are converted in parallel by a process pool, the out_dir tree mirrors the
+in_dir tree. Outputs that are up to date are skipped :
+
+- --check mtime (default) : the output is more recent than the input
+- --check hash : the content hash of the input matches the one recorded when the output was written
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from OCCDataExchange.cache import ShapeCache
+from OCCDataExchange.extensions import brep_extensions, iges_extensions, step_extensions, stl_extensions
+
+logger = logging.getLogger(__name__)
+
+# formats accepted by utils.shape_to_file()
+CONVERT_FORMATS = ["step", "iges", "brep", "stl"]
+# extensions accepted by utils.file_to_shape()
+INPUT_EXTENSIONS = iges_extensions + step_extensions + brep_extensions + stl_extensions
+
+# name of the file recording the input hashes in the output directory
+MANIFEST = ".occdx_manifest.json"
+
+
+def find_sources(in_dir, out_dir, to_format):
+    r"""Files of a directory tree that can be converted and their output paths
+
+    Parameters
+    ----------
+    in_dir : str
+    out_dir : str
+    to_format : str
+        One of CONVERT_FORMATS
+
+    Returns
+    -------
+    list[tuple(str, str)]
+        (input path, output path), sorted by input path. Inputs differing only by their extension have
+        the same output path, convert() reports them as failed.
+
+    """
+    sources = list()
+    for root, dirs, files in os.walk(in_dir):
+        dirs.sort()
+        for name in sorted(files):
+            base, ext = os.path.splitext(name)
+            if ext[1:].lower() not in INPUT_EXTENSIONS:
+                continue
+            relative_dir = os.path.relpath(root, in_dir)
+            output = os.path.normpath(os.path.join(out_dir, relative_dir, "%s.%s" % (base, to_format)))
+            sources.append((os.path.join(root, name), output))
+    return sources
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return dict()
+
+
+def _save_manifest(out_dir, manifest):
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def is_up_to_date(source, output, check="mtime", manifest=None, out_dir=None):
+    r"""Is the output of a conversion up to date ?
+
+    Parameters
+    ----------
+    source : str
+    output : str
+    check : str (optional)
+        "mtime" (the default) or "hash"
+    manifest : dict (optional)
+        Output path relative to out_dir -> input hash, required for check="hash"
+    out_dir : str (optional)
+        Required for check="hash"
+
+    Returns
+    -------
+    bool
+
+    """
+    if not os.path.isfile(output):
+        return False
+    if check == "mtime":
+        return os.path.getmtime(output) >= os.path.getmtime(source)
+    elif check == "hash":
+        recorded = manifest.get(os.path.relpath(output, out_dir))
+        return recorded is not None and recorded == ShapeCache.key(source)
+    else:
+        msg = "Unknown up to date check : %s" % check
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def _convert_worker(source, output, to_format):
+    r"""Process pool worker of convert(), converts a single file
+
+    Returns
+    -------
+    tuple
+        (source, output, elapsed, error)
+
+    """
+    from OCCDataExchange.utils import file_to_shape, shape_to_file
+
+    start = time.time()
+    try:
+        output_dir = os.path.dirname(output)
+        if not os.path.isdir(output_dir):
+            try:
+                os.makedirs(output_dir)
+            except OSError:  # created by another worker in the meantime
+                if not os.path.isdir(output_dir):
+                    raise
+        shape = file_to_shape(source)
+        shape_to_file(shape, output_dir, os.path.splitext(os.path.basename(output))[0], format=to_format)
+        return source, output, time.time() - start, None
+    except Exception as e:
+        return source, output, time.time() - start, "%s: %s" % (e.__class__.__name__, e)
+
+
+def convert(in_dir, out_dir, to_format, workers=None, check="mtime", force=False):
+    r"""Convert the files of a directory tree
+
+    Parameters
+    ----------
+    in_dir : str
+    out_dir : str
+    to_format : str
+        One of CONVERT_FORMATS
+    workers : int (optional)
+        Number of worker processes. The default (None) uses the number of CPUs.
+        With workers=1, the files are converted one after the other in the calling process.
+    check : str (optional)
+        How up to date outputs are detected : "mtime" (the default) or "hash"
+    force : bool (optional)
+        If True, up to date outputs are converted again. The default is False.
+
+    Returns
+    -------
+    dict
+        converted, skipped, failed (list of (input path, error)), bytes_in (size of the converted inputs)
+        and elapsed (seconds)
+
+    """
+    if to_format not in CONVERT_FORMATS:
+        msg = "Unknown output format %s, should be one of %s" % (to_format, CONVERT_FORMATS)
+        logger.error(msg)
+        raise ValueError(msg)
+    if not os.path.isdir(in_dir):
+        msg = "%s is not a directory" % in_dir
+        logger.error(msg)
+        raise AssertionError(msg)
+
+    start = time.time()
+    manifest = _load_manifest(out_dir) if check == "hash" else dict()
+    summary = {"converted": 0, "skipped": 0, "failed": list(), "bytes_in": 0, "elapsed": 0.}
+
+    sources = find_sources(in_dir, out_dir, to_format)
+    # inputs differing only by their extension (e.g. part.stp and part.igs) would overwrite the same output
+    outputs = dict()
+    for source, output in sources:
+        outputs.setdefault(output, list()).append(source)
+
+    todo = list()
+    for source, output in sources:
+        if len(outputs[output]) > 1:
+            error = "%s is also the output of %s" % (output, ", ".join(s for s in outputs[output] if s != source))
+            logger.warning("Could not convert %s : %s" % (source, error))
+            summary["failed"].append((source, error))
+        elif not force and is_up_to_date(source, output, check, manifest, out_dir):
+            logger.info("Skipping %s, %s is up to date" % (source, output))
+            summary["skipped"] += 1
+        else:
+            todo.append((source, output))
+    logger.info("Converting %i file(s) to %s" % (len(todo), to_format))
+
+    def _done(source, output, elapsed, error):
+        if error is None:
+            logger.info("Converted %s in %.3f s" % (source, elapsed))
+            summary["converted"] += 1
+            summary["bytes_in"] += os.path.getsize(source)
+            if check == "hash":
+                manifest[os.path.relpath(output, out_dir)] = ShapeCache.key(source)
+        else:
+            logger.warning("Could not convert %s : %s" % (source, error))
+            summary["failed"].append((source, error))
+
+    if workers == 1:
+        for source, output in todo:
+            _done(*_convert_worker(source, output, to_format))
+    elif todo:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = dict((executor.submit(_convert_worker, source, output, to_format), (source, output))
+                           for source, output in todo)
+            for future in as_completed(futures):
+                # a crashed worker (BrokenProcessPool) only fails its file, the other results are kept
+                try:
+                    result = future.result()
+                except Exception as e:
+                    source, output = futures[future]
+                    result = source, output, time.time() - start, "%s: %s" % (e.__class__.__name__, e)
+                _done(*result)
+
+    if check == "hash" and summary["converted"]:
+        _save_manifest(out_dir, manifest)
+    summary["elapsed"] = time.time() - start
+    return summary
+
+
+def format_summary(summary):
+    r"""Throughput summary of convert()
+
+    Parameters
+    ----------
+    summary : dict
+        As returned by convert()
+
+    Returns
+    -------
+    str
+
+    """
+    elapsed = max(summary["elapsed"], 1e-9)
+    lines = ["%i converted, %i skipped, %i failed in %.2f s (%.2f files/s, %.2f MB/s)"
+             % (summary["converted"], summary["skipped"], len(summary["failed"]), summary["elapsed"],
+                summary["converted"] / elapsed, summary["bytes_in"] / 1024. ** 2 / elapsed)]
+    for source, error in summary["failed"]:
+        lines.append("FAILED %s : %s" % (source, error))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    r"""Entry point of the occdx command
+
+    Returns
+    -------
+    int
+        Exit status : 0 on success, 1 if a conversion failed
+
+    """
+    parser = argparse.ArgumentParser(prog="occdx", description="OCCDataExchange command line interface")
+    subparsers = parser.add_subparsers(dest="command")
+
+    convert_parser = subparsers.add_parser("convert", help="convert the CAD files of a directory tree")
+    convert_parser.add_argument("in_dir", help="directory of the files to convert")
+    convert_parser.add_argument("out_dir", help="directory of the converted files")
+    convert_parser.add_argument("--to", required=True, choices=CONVERT_FORMATS, help="output format")
+    convert_parser.add_argument("--workers", type=int, default=None,
+                                help="number of worker processes (default: number of CPUs)")
+    convert_parser.add_argument("--check", choices=["mtime", "hash"], default="mtime",
+                                help="how up to date outputs are detected (default: mtime)")
+    convert_parser.add_argument("--force", action="store_true", help="convert up to date outputs again")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log the conversion of each file")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+
+    summary = convert(args.in_dir, args.out_dir, args.to, workers=args.workers, check=args.check,
+                      force=args.force)
+    print(format_summary(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
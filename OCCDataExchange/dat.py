@@ -8,15 +8,88 @@ Summary
 
 Deals with .dat files, mostly used to define 2D foil sections
 
+A point is a line made of 2 numbers separated by whitespace, optionally followed by a # comment.
+Any other non-empty line (a section name, a blank line ...) separates 2 sections of points.
+Lines made of a comment only are ignored.
+
 """
 
+import itertools
 import logging
+import os
+import re
 
 from OCCDataExchange.checks import check_importer_filename
 from OCCDataExchange.extensions import dat_extensions
+from OCCDataExchange.stats import ConversionStats
 
 logger = logging.getLogger(__name__)
 
+_number = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_point_line = r"^[ \t]*%s[ \t]+%s[ \t]*(?:#[^\n]*)?\r?$"
+# captures the 2 coordinates of a point line
+_point_regex = re.compile(_point_line % ("(%s)" % _number, "(%s)" % _number), re.MULTILINE)
+# matches a run of consecutive point lines
+_section_regex = re.compile(r"(?:%s(?:\n|\Z))+" % (_point_line % (_number, _number)), re.MULTILINE)
+_comment_line_regex = re.compile(r"^[ \t]*#[^\n]*(?:\n|\Z)", re.MULTILINE)
+
+
+def _parse_points(text, as_3d=False):
+    r"""Points of a .dat text as a contiguous array
+
+    Parameters
+    ----------
+    text : str
+    as_3d : bool
+        If True, a z=0. column is added
+
+    Returns
+    -------
+    numpy.ndarray
+        (N, 2) or (N, 3) float array
+
+    """
+    import numpy as np
+
+    points = np.array(_point_regex.findall(text), dtype=np.float64).reshape(-1, 2)
+    if as_3d:
+        points = np.hstack([points, np.zeros((len(points), 1))])
+    return points
+
+
+def iter_dat_chunks(filename, chunk_size=100000, as_3d=False, skip_first_line=False):
+    r"""Read the points of a (large) .dat file by chunks
+
+    Section boundaries are not reported, use DatImporter.sections for that.
+
+    Parameters
+    ----------
+    filename : str
+    chunk_size : int (optional)
+        Number of lines parsed at once. The default is 100000.
+    as_3d : bool (optional)
+        If True, each point has 3 elements (x, y, z=0.)
+    skip_first_line : bool (optional)
+        If True, the first line of the .dat file is skipped
+
+    Yields
+    ------
+    numpy.ndarray
+        (n, 2) or (n, 3) float array of the points of chunk_size lines, at most
+
+    """
+    check_importer_filename(filename, dat_extensions)
+    with open(filename) as f:
+        if skip_first_line:
+            f.readline()
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            points = _parse_points("".join(lines), as_3d)
+            if len(points) > 0:
+                yield points
+
 
 class DatImporter(object):
     r"""dat importer
@@ -29,42 +102,81 @@ class DatImporter(object):
         If True, each point has 3 elements (x, y, z=0.), if False, each point has 2 elements (x, y)
     skip_first_line : bool
         If True, the first line of the .dat file is skipped
+    lazy : bool (optional)
+        If True, only the filename is checked at instantiation and the file is read
+        on first access to the results. The default is False (read at instantiation).
 
     """
 
-    def __init__(self, filename, as_3d=False, skip_first_line=False):
+    def __init__(self, filename, as_3d=False, skip_first_line=False, lazy=False):
 
         check_importer_filename(filename, dat_extensions)
         self._filename = filename
         self._as_3d = as_3d
         self._skip_first_line = skip_first_line
 
-        self._points = list()
+        self._sections = list()
+        self._array = None
+        self._points = None
+        self._is_read = False
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+
+        if not lazy:
+            self._ensure_read()
 
-        logger.info("Reading file ....")
-        self.read_file()
+    def _ensure_read(self):
+        r"""Read the file if it has not been read yet"""
+        if not self._is_read:
+            logger.info("Reading file ....")
+            self.read_file()
 
     def read_file(self):
         r"""Read the .dat file"""
+        import numpy as np
+
+        with self.stats.phase("read"):
+            with open(self._filename) as f:
+                if self._skip_first_line:
+                    f.readline()
+                text = _comment_line_regex.sub("", f.read())
+
+            self._sections = [_parse_points(match.group(0), self._as_3d)
+                              for match in _section_regex.finditer(text)]
+            if self._sections:
+                self._array = np.concatenate(self._sections)
+            else:
+                self._array = np.empty((0, 3 if self._as_3d else 2))
+        self._points = None
+        logger.info("%i points in %i section(s) in .dat file" % (len(self._array), len(self._sections)))
+        self.stats.count("bytes_read", os.path.getsize(self._filename))
+        self.stats.count("points", len(self._array))
+        self.stats.report()
+        self._is_read = True
+
+    @property
+    def array(self):
+        r"""All the points of the file
+
+        Returns
+        -------
+        numpy.ndarray
+            (N, 2) or (N, 3) float array
+
+        """
+        self._ensure_read()
+        return self._array
+
+    @property
+    def sections(self):
+        r"""Points of each section of the file
 
-        points = list()
-        with open(self._filename) as f:
-            lines = f.readlines()
-
-        if self._skip_first_line:
-            lines = lines[1:]
-
-        for line in lines:
-            line = line.lstrip().rstrip().replace('    ', ' ').replace('   ', ' ').replace('  ', ' ')
-            data = line.split(' ')  # data[0] = x coord.    data[1] = y coord.
-            # 3 - create an array of points
-            if len(data) == 2:  # two coordinates for each point
-                if self._as_3d:
-                    points.append((float(data[0]), float(data[1]), 0.0))
-                else:
-                    points.append((float(data[0]), float(data[1])))
-        logger.info("%i points in .dat file" % len(points))
-        self._points = points
+        Returns
+        -------
+        list[numpy.ndarray]
+
+        """
+        self._ensure_read()
+        return self._sections
 
     @property
     def points(self):
@@ -75,4 +187,7 @@ class DatImporter(object):
         list[tuple]
 
         """
+        self._ensure_read()
+        if self._points is None:
+            self._points = [tuple(point) for point in self._array.tolist()]
         return self._points
@@ -6,18 +6,45 @@ r"""IGES module of OCCDataExchange"""
 from __future__ import print_function
 
 import logging
-
-from OCC import BRep
-from OCC import IFSelect
-from OCC import IGESControl
-from OCC import TopoDS
-from OCCUtils.types_lut import topo_lut
+import os
 
 from OCCDataExchange.checks import check_importer_filename, check_exporter_filename, check_overwrite, check_shape
 from OCCDataExchange.extensions import iges_extensions
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.scan import IgesRoot, IgesScan, scan_iges  # noqa: F401 (pure Python, usable without OCC from scan)
+from OCCDataExchange.sessions import IgesWriterSession
+from OCCDataExchange.stats import ConversionStats
+from OCCDataExchange.utils import RootInfo, ShapeInstances, same_shapes, select_roots
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+BRep = lazy_import("OCC.BRep")
+IFSelect = lazy_import("OCC.IFSelect")
+IGESControl = lazy_import("OCC.IGESControl")
+IGESData = lazy_import("OCC.IGESData")
+TopoDS = lazy_import("OCC.TopoDS")
+types_lut = lazy_import("OCCUtils.types_lut")
+
+
+def _entity_label(entity):
+    r"""Name of an IGES root entity
+
+    Parameters
+    ----------
+    entity : Standard.Handle_Standard_Transient
+
+    Returns
+    -------
+    str or None
+        None if the entity has no name
+
+    """
+    iges_entity = IGESData.Handle_IGESData_IGESEntity.DownCast(entity)
+    if iges_entity.IsNull() or not iges_entity.GetObject().HasName():
+        return None
+    return iges_entity.GetObject().NameValue().GetObject().ToCString()
+
 
 class IgesImporter(object):
     r"""IGES importer
@@ -26,10 +53,18 @@ class IgesImporter(object):
     ----------
     filename : str
         Absolute filepath
+    cache : OCCDataExchange.cache.ShapeCache (optional)
+        If provided, the translated shapes are looked up in / stored to the cache
+    lazy : bool (optional)
+        If True, only the filename is checked at instantiation and the file is read
+        on first access to the results. The default is False (read at instantiation).
+    roots : iterable of int or callable (optional)
+        Indices (starting at 1) of the roots to transfer, or a predicate called with the
+        OCCDataExchange.utils.RootInfo of each root. The default (None) transfers all the roots.
 
     """
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, cache=None, lazy=False, roots=None):
         logger.info("IgesImporter instantiated with filename : %s" % filename)
 
         check_importer_filename(filename, iges_extensions)
@@ -37,45 +72,137 @@ class IgesImporter(object):
         self._shapes = list()
         self.nb_shapes = 0
         self._filename = filename
+        self._cache = cache
+        self._roots = roots if roots is None or callable(roots) else list(roots)
+        self._reader = None
+        self._compound = None
+        self._compound_shapes = list()
+        self._is_read = False
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+
+        if not lazy:
+            self._ensure_read()
+
+    def _ensure_read(self):
+        r"""Read the file if it has not been read yet"""
+        if not self._is_read:
+            logger.info("Reading file ....")
+            self.read_file()
 
-        logger.info("Reading file ....")
-        self.read_file()
+    def _load(self):
+        r"""Parse the file (without transferring any root) with an IGESControl_Reader
+
+        The reader is kept until the transfer so that list_roots() and read_file() parse the file only once
+
+        Returns
+        -------
+        IGESControl.IGESControl_Reader
+
+        """
+        if self._reader is None:
+            igescontrol_reader = IGESControl.IGESControl_Reader()
+            with self.stats.phase("read"):
+                status = igescontrol_reader.ReadFile(self._filename)
+            self.stats.count("bytes_read", os.path.getsize(self._filename))
+            with self.stats.phase("check"):
+                igescontrol_reader.PrintCheckLoad(False, IFSelect.IFSelect_ItemsByEntity)
+
+            if status != IFSelect.IFSelect_RetDone:
+                msg = "Status is not IFSelect.IFSelect_RetDone or No root for transfer"
+                logger.error(msg)
+                raise ValueError(msg)
+            self._reader = igescontrol_reader
+        return self._reader
+
+    def list_roots(self):
+        r"""Describe the roots for transfer of the file, without transferring them
+
+        Returns
+        -------
+        list[OCCDataExchange.utils.RootInfo]
+
+        """
+        igescontrol_reader = self._load()
+        root_infos = list()
+        for n in range(1, igescontrol_reader.NbRootsForTransfer() + 1):
+            entity = igescontrol_reader.RootForTransfer(n)
+            entity_type = entity.GetObject().DynamicType().GetObject().Name()
+            root_infos.append(RootInfo(n, entity_type, _entity_label(entity)))
+        return root_infos
 
     def read_file(self):
         """
         Read the IGES file and stores the result in a list of TopoDS.TopoDS_Shape
 
         """
-        igescontrol_reader = IGESControl.IGESControl_Reader()
-        status = igescontrol_reader.ReadFile(self._filename)
-        igescontrol_reader.PrintCheckLoad(False, IFSelect.IFSelect_ItemsByEntity)
+        # a predicate can only be evaluated on the parsed file, its result cannot be cached
+        use_cache = self._cache is not None and not callable(self._roots)
+        if use_cache:
+            roots_key = None if self._roots is None else sorted(set(self._roots))
+            cache_key = self._cache.key(self._filename, importer="iges", roots=roots_key)
+            shapes = self._cache.get(cache_key)
+            if shapes is not None:
+                logger.info("%i shape(s) found in cache" % len(shapes))
+                self._shapes = shapes
+                self.nb_shapes = len(shapes)
+                self.stats.count("cache_hits")
+                self.stats.count("shapes", len(shapes))
+                self.stats.report()
+                self._is_read = True
+                return
+
+        igescontrol_reader = self._load()
         nb_roots = igescontrol_reader.NbRootsForTransfer()
         logger.info("Nb roots for transfer : %i" % nb_roots)
+        self.stats.count("roots", nb_roots)
 
-        if status == IFSelect.IFSelect_RetDone and nb_roots != 0:
+        if nb_roots == 0:
+            msg = "Status is not IFSelect.IFSelect_RetDone or No root for transfer"
+            logger.error(msg)
+            raise ValueError(msg)
 
+        with self.stats.phase("check"):
             igescontrol_reader.PrintCheckTransfer(False, IFSelect.IFSelect_ItemsByEntity)
-            ok = igescontrol_reader.TransferRoots()
-            logger.info("TransferRoots status : %i" % ok)
-            self.nb_shapes = igescontrol_reader.NbShapes()
-
-            for n in range(1, nb_roots + 1):
-
-                logger.debug("Root index %i" % n)
 
-                # for i in range(1, self.nb_shapes + 1):
-                a_shape = igescontrol_reader.Shape(n)
-                if a_shape.IsNull():
-                    msg = "At least one shape in IGES cannot be transferred"
-                    logger.warning(msg)
-                else:
-                    self._shapes.append(a_shape)
-                    logger.debug("Appending a %s to list of shapes" %
-                                 topo_lut[a_shape.ShapeType()])
+        if self._roots is None:
+            with self.stats.phase("transfer"):
+                ok = igescontrol_reader.TransferRoots()
+            logger.info("TransferRoots status : %i" % ok)
+            shape_indices = range(1, nb_roots + 1)
         else:
-            msg = "Status is not IFSelect.IFSelect_RetDone or No root for transfer"
-            logger.error(msg)
-            raise ValueError(msg)
+            indices = select_roots(self.list_roots(), self._roots)
+            logger.info("%i root(s) selected for transfer" % len(indices))
+            with self.stats.phase("transfer"):
+                for n in indices:
+                    ok = igescontrol_reader.TransferRoot(n)
+                    logger.debug("Root index %i - TransferRoot status : %i" % (n, ok))
+                    if not ok:
+                        self.stats.count("failed_transfers")
+            # the shapes resulting from the transfers are appended to the shapes of the reader
+            shape_indices = range(1, igescontrol_reader.NbShapes() + 1)
+        self.nb_shapes = igescontrol_reader.NbShapes()
+
+        for n in shape_indices:
+
+            logger.debug("Shape index %i" % n)
+
+            a_shape = igescontrol_reader.Shape(n)
+            if a_shape.IsNull():
+                msg = "At least one shape in IGES cannot be transferred"
+                logger.warning(msg)
+                self.stats.count("failed_transfers")
+            else:
+                self._shapes.append(a_shape)
+                self.stats.count("shapes")
+                logger.debug("Appending a %s to list of shapes" %
+                             types_lut.topo_lut[a_shape.ShapeType()])
+
+        self._reader = None  # release the IGES model
+
+        if use_cache:
+            self._cache.put(cache_key, self._shapes, os.path.getsize(self._filename))
+        self.stats.report()
+        self._is_read = True
 
     @property
     def compound(self):
@@ -94,14 +221,20 @@ class IgesImporter(object):
         24 edges
 
         """
-        # Create a compound
-        compound = TopoDS.TopoDS_Compound()
-        brep_builder = BRep.BRep_Builder()
-        brep_builder.MakeCompound(compound)
-        # Populate the compound
-        for shape in self._shapes:
-            brep_builder.Add(compound, shape)
-        return compound
+        self._ensure_read()
+        # The compound is only rebuilt if the shapes list has changed since it was last built
+        if self._compound is None or not same_shapes(self._compound_shapes, self._shapes):
+            with self.stats.phase("compound"):
+                # Create a compound
+                compound = TopoDS.TopoDS_Compound()
+                brep_builder = BRep.BRep_Builder()
+                brep_builder.MakeCompound(compound)
+                # Populate the compound
+                for shape in self._shapes:
+                    brep_builder.Add(compound, shape)
+            self._compound = compound
+            self._compound_shapes = list(self._shapes)
+        return self._compound
 
     @property
     def shapes(self):
@@ -112,8 +245,20 @@ class IgesImporter(object):
         list[TopoDS.TopoDS_Shape]
 
         """
+        self._ensure_read()
         return self._shapes
 
+    def iter_shapes(self):
+        r"""Iterate over the shapes without building a compound
+
+        Returns
+        -------
+        iterator over TopoDS.TopoDS_Shape
+
+        """
+        self._ensure_read()
+        return iter(self._shapes)
+
 
 class IgesExporter(object):
     r"""IGES exporter
@@ -122,28 +267,29 @@ class IgesExporter(object):
     ----------
     filename : str
     format : ["5.1", "5.3"]
+    deduplicate : bool (optional)
+        If True, a shape added several times (same geometry, location and orientation) is written once.
+        The default is False.
+    session : OCCDataExchange.sessions.IgesWriterSession (optional)
+        Writer session to use, format is then ignored.
+        The default (None) creates a session of format.
 
     """
 
-    def __init__(self, filename, format="5.1"):
+    def __init__(self, filename, format="5.1", deduplicate=False, session=None):
+        if session is None:
+            session = IgesWriterSession(format=format)
         logger.info("IgesExporter instantiated with filename : %s" % filename)
-        logger.info("IgesExporter format : %s" % format)
-
-        if format not in ["5.1", "5.3"]:
-            msg = "Unsupported IGES format"
-            logger.error(msg)
-            raise ValueError(msg)
+        logger.info("IgesExporter format : %s" % session.format)
 
         check_exporter_filename(filename, iges_extensions)
         check_overwrite(filename)
 
         self._shapes = list()
+        self._instances = ShapeInstances() if deduplicate else None
         self._filename = filename
-
-        if format == "5.3":
-            self._brepmode = True
-        else:
-            self._brepmode = False
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+        self._session = session
 
     def add_shape(self, a_shape):
         r"""Add shape
@@ -154,6 +300,10 @@ class IgesExporter(object):
 
         """
         check_shape(a_shape)  # raises an exception if the shape is not valid
+        if self._instances is not None and not self._instances.add(a_shape):
+            logger.debug("Shape already added to the IGES exporter, ignored")
+            self.stats.count("duplicates")
+            return
         self._shapes.append(a_shape)
 
     def write_file(self):
@@ -164,16 +314,22 @@ class IgesExporter(object):
         bool
 
         """
-        IGESControl.IGESControl_Controller().Init()
-        iges_writer = IGESControl.IGESControl_Writer("write.iges.unit", self._brepmode)
-        for shape in self._shapes:
-            iges_writer.AddShape(shape)
-        iges_writer.ComputeModel()
-
-        write_status = iges_writer.Write(self._filename)
+        with self._session.activate():
+            iges_writer = self._session.new_writer()
+        with self.stats.phase("transfer"):
+            for shape in self._shapes:
+                if not iges_writer.AddShape(shape):
+                    self.stats.count("failed_transfers")
+            iges_writer.ComputeModel()
+        self.stats.count("shapes", len(self._shapes))
+
+        with self.stats.phase("write"):
+            write_status = iges_writer.Write(self._filename)
 
         if write_status == IFSelect.IFSelect_RetDone:
             logger.info("IGES file write successful.")
+            self.stats.count("bytes_written", os.path.getsize(self._filename))
+            self.stats.report()
         else:
             msg = "An error occurred while writing the IGES file"
             logger.error(msg)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""lazy module of OCCDataExchange
+
+Summary
+-------
+
+Deferred imports of the OCC and OCCUtils modules.
+
+Importing the OCC extension modules takes a noticeable time, lazy_import() returns a placeholder that
+imports the actual module on first attribute access. The modules of OCCDataExchange can thus be imported
+without loading OCC, which only happens when a file is actually read or written.
+
+"""
+
+import importlib
+
+
+class LazyModule(object):
+    r"""Placeholder of a module imported on first attribute access
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module, e.g. "OCC.TopoDS"
+
+    """
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = self.__dict__["_lazy_module"] = importlib.import_module(self.__dict__["_lazy_name"])
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return "<lazy module %r (%s)>" % (self.__dict__["_lazy_name"], state)
+
+
+def lazy_import(name):
+    r"""Module imported on first attribute access
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module, e.g. "OCC.TopoDS"
+
+    Returns
+    -------
+    LazyModule
+
+    """
+    return LazyModule(name)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""scan module of OCCDataExchange
+
+Summary
+-------
+
+Fast, pure Python pre-scan of CAD files, without loading OCC.
+
+The scanners read the file header (STEP HEADER section, IGES Global section) and tally the entities of the
+file in a single sequential pass over a memory-mapped file. They are meant for triage and cost estimation
+before an actual import.
+
+"""
+
+from __future__ import print_function
+
+import collections
+import contextlib
+import logging
+import mmap
+import re
+
+from OCCDataExchange.checks import check_importer_filename
+from OCCDataExchange.extensions import iges_extensions, step_extensions
+
+logger = logging.getLogger(__name__)
+
+StepScan = collections.namedtuple("StepScan", ["schema", "schema_names", "name", "description",
+                                               "product_names", "entity_counts", "nb_entities"])
+StepScan.__doc__ = r"""Result of scan_step()
+
+schema : "AP203", "AP214", "AP242" or None if the schema is not recognized
+schema_names : schema names of the FILE_SCHEMA header entity
+name : name of the FILE_NAME header entity
+description : descriptions of the FILE_DESCRIPTION header entity
+product_names : names of the PRODUCT entities
+entity_counts : dict entity type -> number of instances, complex instances are counted as "(COMPLEX)"
+nb_entities : total number of entity instances
+"""
+
+IgesScan = collections.namedtuple("IgesScan", ["version", "version_flag", "units", "unit_flag", "system",
+                                               "entity_counts", "roots", "nb_entities"])
+IgesScan.__doc__ = r"""Result of scan_iges()
+
+version : IGES version (e.g. "5.3") or None if the version flag is not recognized
+version_flag : version flag (global parameter 23)
+units : unit name (e.g. "MM")
+unit_flag : unit flag (global parameter 14)
+system : native system ID (global parameter 5)
+entity_counts : dict entity type number -> number of entities
+roots : root candidates (independent geometry entities) as IgesRoot
+nb_entities : total number of entities of the Directory Entry section
+"""
+
+IgesRoot = collections.namedtuple("IgesRoot", ["number", "entity_type", "form", "label"])
+IgesRoot.__doc__ = r"""Independent geometry entity of an IGES file
+
+number : sequence number of the first line of its directory entry
+entity_type : entity type number (e.g. 186 for a manifold solid B-Rep object)
+form : form number
+label : entity label or None
+"""
+
+# version flag (global parameter 23) -> IGES version
+_iges_versions = {1: "1.0", 2: "ANSI Y14.26M-1981", 3: "2.0", 4: "3.0", 5: "ASME/ANSI Y14.26M-1987",
+                  6: "4.0", 7: "ASME Y14.26M-1989", 8: "5.0", 9: "5.1", 10: "5.2", 11: "5.3"}
+# unit flag (global parameter 14) -> unit name, 3 means that the name is given by global parameter 15
+_iges_units = {1: "IN", 2: "MM", 4: "FT", 5: "MI", 6: "M", 7: "KM", 8: "MIL", 9: "UM", 10: "CM", 11: "UIN"}
+_iges_hollerith_regex = re.compile(br"\s*(\d+)H")
+
+# schema name prefix -> application protocol
+_step_schemas = [("CONFIG_CONTROL_DESIGN", "AP203"),
+                 ("AP203", "AP203"),
+                 ("AUTOMOTIVE_DESIGN", "AP214"),
+                 ("AP214", "AP214"),
+                 ("AP242", "AP242")]
+
+_step_comment_regex = re.compile(br"/\*.*?\*/", re.DOTALL)
+_step_string = br"'((?:[^']|'')*)'"
+_step_string_regex = re.compile(_step_string)
+_step_header_regex = re.compile(br"HEADER\s*;(.*?)ENDSEC\s*;", re.DOTALL)
+_step_header_entity_regex = re.compile(br"(FILE_DESCRIPTION|FILE_NAME|FILE_SCHEMA)\s*\((.*?)\)\s*;", re.DOTALL)
+_step_data_regex = re.compile(br"DATA\s*;")
+# a complex entity instance has no type name before its opening parenthesis,
+# the first 2 string arguments are captured when present (the id and name of a PRODUCT)
+_step_instance_regex = re.compile(br"#\d+\s*=\s*([A-Za-z0-9_]*)\s*\((?:\s*" + _step_string + br"\s*,\s*" +
+                                  _step_string + br")?")
+
+
+def _step_str(value):
+    r"""Decode a STEP string (quotes and backslashes are doubled in STEP strings)"""
+    return value.replace(b"''", b"'").replace(b"\\\\", b"\\").decode("latin-1")
+
+
+@contextlib.contextmanager
+def _mapped(filename):
+    r"""Memory map a file for reading (empty files cannot be memory-mapped)"""
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            yield b""
+            return
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def step_schema(schema_name):
+    r"""Application protocol of a STEP schema name
+
+    Parameters
+    ----------
+    schema_name : str
+        e.g. 'AUTOMOTIVE_DESIGN { 1 0 10303 214 1 1 1 1 }'
+
+    Returns
+    -------
+    str or None
+        "AP203", "AP214", "AP242" or None if the schema is not recognized
+
+    """
+    upper_name = schema_name.strip().upper()
+    for prefix, protocol in _step_schemas:
+        if upper_name.startswith(prefix):
+            return protocol
+    return None
+
+
+def scan_step(filename):
+    r"""Scan the header and tally the entities of a STEP (ISO-10303-21) file
+
+    The scan relies on regular expressions rather than on a full parser: entity instances
+    or products hidden in strings or comments of the DATA section may be miscounted.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    StepScan
+
+    Raises
+    ------
+    ValueError
+        if the file has no HEADER section
+
+    """
+    check_importer_filename(filename, step_extensions)
+
+    with _mapped(filename) as data:
+        header_match = _step_header_regex.search(data)
+        if header_match is None:
+            msg = "No HEADER section in %s" % filename
+            logger.error(msg)
+            raise ValueError(msg)
+
+        header = _step_comment_regex.sub(b"", header_match.group(1))
+        header_entities = dict((name, args) for name, args in _step_header_entity_regex.findall(header))
+        schema_names = [_step_str(s) for s in _step_string_regex.findall(header_entities.get(b"FILE_SCHEMA", b""))]
+        names = [_step_str(s) for s in _step_string_regex.findall(header_entities.get(b"FILE_NAME", b""))]
+        description = [_step_str(s) for s in
+                       _step_string_regex.findall(header_entities.get(b"FILE_DESCRIPTION", b"").split(b")")[0])]
+
+        data_match = _step_data_regex.search(data, header_match.end())
+        entity_counts = collections.Counter()
+        product_names = list()
+        if data_match is not None:
+            # a single pass over the DATA section for the entity counts and the product names
+            for name, _, product_name in _step_instance_regex.findall(data, data_match.end()):
+                entity_counts[name] += 1
+                if name.upper() == b"PRODUCT":
+                    product_names.append(_step_str(product_name))
+
+    type_counts = dict()
+    for name, count in entity_counts.items():
+        entity_type = name.decode("ascii").upper() if name else "(COMPLEX)"
+        type_counts[entity_type] = type_counts.get(entity_type, 0) + count
+    schemas = [step_schema(name) for name in schema_names]
+    schema = next((s for s in schemas if s is not None), None)
+    logger.info("%s : schema %s, %i entities" % (filename, schema, sum(type_counts.values())))
+
+    return StepScan(schema=schema,
+                    schema_names=schema_names,
+                    name=names[0] if names else None,
+                    description=description,
+                    product_names=product_names,
+                    entity_counts=type_counts,
+                    nb_entities=sum(type_counts.values()))
+
+
+def _iges_records(data):
+    r"""80 columns records of an IGES file, with or without line separators"""
+    if data[80:82].strip(b" ") and data[80:81] not in (b"\r", b"\n"):
+        # fixed length records without line separators
+        for start in range(0, len(data), 80):
+            yield data[start:start + 80]
+        return
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start)
+        if end == -1:
+            end = len(data)
+        yield data[start:end].rstrip(b"\r")
+        start = end + 1
+
+
+def _iges_global_parameters(text):
+    r"""Parameters of the Global section of an IGES file
+
+    Parameters
+    ----------
+    text : bytes
+        Concatenated columns 1-72 of the Global section lines
+
+    Returns
+    -------
+    list[str]
+        Strings without their Hollerith prefix, other parameters stripped, empty parameters as ""
+
+    """
+    parameter_delimiter, record_delimiter = b",", b";"
+    parameters = list()
+    pos = 0
+    while pos < len(text):
+        hollerith = _iges_hollerith_regex.match(text, pos)
+        if hollerith is not None:
+            start = hollerith.end()
+            value = text[start:start + int(hollerith.group(1))]
+            pos = start + len(value)
+        else:
+            end = pos
+            while end < len(text) and text[end:end + 1] not in (parameter_delimiter, record_delimiter):
+                end += 1
+            value = text[pos:end].strip()
+            pos = end
+        parameters.append(value.decode("latin-1"))
+
+        # the first 2 parameters redefine the delimiters, the delimiter following them is the new one
+        if len(parameters) == 1 and value:
+            parameter_delimiter = value
+        elif len(parameters) == 2 and value:
+            record_delimiter = value
+
+        # skip the blanks up to the next delimiter
+        while pos < len(text) and text[pos:pos + 1] not in (parameter_delimiter, record_delimiter):
+            pos += 1
+        if text[pos:pos + 1] != parameter_delimiter:
+            break
+        pos += 1
+    return parameters
+
+
+def _int_parameter(parameters, index):
+    r"""Integer value of the 1-based global parameter index, None if missing or not an integer"""
+    try:
+        return int(parameters[index - 1])
+    except (IndexError, ValueError):
+        return None
+
+
+def scan_iges(filename):
+    r"""Scan the Global and Directory Entry sections of an IGES file
+
+    The fixed column sections are read in a single sequential pass over a memory-mapped file, the
+    Parameter Data section is skipped.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    IgesScan
+
+    Raises
+    ------
+    ValueError
+        if the file has no Global section (empty, compressed or binary IGES file)
+
+    """
+    check_importer_filename(filename, iges_extensions)
+
+    global_lines = list()
+    entity_counts = dict()
+    roots = list()
+    with _mapped(filename) as data:
+        directory_entry = None
+        for record in _iges_records(data):
+            section = record[72:73]
+            if section == b"G":
+                global_lines.append(record[:72].ljust(72))
+            elif section == b"D":
+                if directory_entry is None:
+                    # first line : entity type, ..., status number (columns 65-72)
+                    directory_entry = record
+                    continue
+                # second line : ..., form number (columns 33-40), entity label (columns 57-64)
+                try:
+                    entity_type = int(directory_entry[0:8])
+                except ValueError:
+                    logger.warning("Invalid directory entry in %s : %r" % (filename, directory_entry))
+                    directory_entry = None
+                    continue
+                entity_counts[entity_type] = entity_counts.get(entity_type, 0) + 1
+                # status number digits 3-4 : subordinate entity switch (00 : independent),
+                # digits 5-6 : entity use flag (00 : geometry)
+                if directory_entry[64:72].replace(b" ", b"0")[2:6] == b"0000":
+                    form = record[32:40].strip()
+                    label = record[56:64].strip()
+                    roots.append(IgesRoot(number=int(directory_entry[73:80]),
+                                          entity_type=entity_type,
+                                          form=int(form) if form else 0,
+                                          label=label.decode("latin-1") if label else None))
+                directory_entry = None
+            elif section in (b"P", b"T"):
+                # the Directory Entry section is over
+                break
+
+    if not global_lines:
+        msg = "No Global section in %s" % filename
+        logger.error(msg)
+        raise ValueError(msg)
+
+    parameters = _iges_global_parameters(b"".join(global_lines))
+    version_flag = _int_parameter(parameters, 23)
+    unit_flag = _int_parameter(parameters, 14)
+    unit_name = parameters[14] if len(parameters) > 14 else ""
+    nb_entities = sum(entity_counts.values())
+    logger.info("%s : IGES version %s, %i entities, %i roots" % (filename, _iges_versions.get(version_flag),
+                                                                nb_entities, len(roots)))
+
+    return IgesScan(version=_iges_versions.get(version_flag),
+                    version_flag=version_flag,
+                    units=unit_name or _iges_units.get(unit_flag),
+                    unit_flag=unit_flag,
+                    system=parameters[4] if len(parameters) > 4 else None,
+                    entity_counts=entity_counts,
+                    roots=roots,
+                    nb_entities=nb_entities)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""sessions module of OCCDataExchange
+
+Summary
+-------
+
+Writer sessions of the STEP and IGES exporters.
+
+The OCC writers read their parameters (e.g. write.step.schema) from the process wide Interface_Static
+table, when the writer is created, when the shapes are transferred to it and when the file is written.
+A writer session keeps its own parameters and only applies them to the table while it holds the static lock.
+Exports with different parameters can thus run in the same process (from several threads) without mixing up
+their parameters.
+
+Concurrency : the STEP transfers and writes of all the exports of a process are serialized by the static
+lock. The IGES exports only hold the lock to create their writer.
+
+The IGES controller is initialized once per process rather than on every write.
+
+Sessions are immutable and can be shared by any number of exports.
+
+"""
+
+from __future__ import print_function
+
+import contextlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# serializes the sections of code that change or depend on the Interface_Static table
+_static_lock = threading.RLock()
+_iges_controller_initialized = False
+
+step_schemas = ["AP203", "AP214CD"]
+iges_formats = ["5.1", "5.3"]
+
+
+def _init_iges_controller():
+    r"""Initialize the IGES controller, once per process"""
+    global _iges_controller_initialized
+    with _static_lock:
+        if not _iges_controller_initialized:
+            from OCC import IGESControl
+
+            IGESControl.IGESControl_Controller().Init()
+            _iges_controller_initialized = True
+
+
+class WriterSession(object):
+    r"""Interface_Static parameters of a writer, applied while the session is active
+
+    Parameters
+    ----------
+    parameters : dict
+        Interface_Static parameter name -> value (str)
+
+    """
+
+    def __init__(self, parameters=None):
+        self._parameters = dict(parameters or dict())
+
+    @property
+    def parameters(self):
+        r"""Interface_Static parameters of the session
+
+        Returns
+        -------
+        dict
+
+        """
+        return dict(self._parameters)
+
+    @contextlib.contextmanager
+    def activate(self, overrides=None):
+        r"""Context manager applying the parameters of the session to the Interface_Static table
+
+        The static lock is held and the previous values are restored on exit.
+
+        Parameters
+        ----------
+        overrides : dict (optional)
+            Parameters taking precedence over the ones of the session for this activation only
+
+        """
+        from OCC import Interface
+
+        parameters = dict(self._parameters)
+        parameters.update(overrides or dict())
+        with _static_lock:
+            previous = dict((name, Interface.Interface_Static_CVal(name)) for name in parameters)
+            for name, value in parameters.items():
+                Interface.Interface_Static_SetCVal(name, str(value))
+            try:
+                yield self
+            finally:
+                for name, value in previous.items():
+                    Interface.Interface_Static_SetCVal(name, value)
+
+
+class StepWriterSession(WriterSession):
+    r"""STEP writer session
+
+    Parameters
+    ----------
+    schema : ["AP203", "AP214CD"]
+        which STEP schema to use, either AP214CD or AP203
+    tolerance : float
+
+    """
+
+    def __init__(self, schema="AP214CD", tolerance=1e-4):
+        if schema not in step_schemas:
+            msg = "Unsupported STEP schema"
+            logger.error(msg)
+            raise AssertionError(msg)
+        super(StepWriterSession, self).__init__({"write.step.schema": schema})
+        self.schema = schema
+        self.tolerance = tolerance
+
+    def new_writer(self):
+        r"""A new STEP writer, to be called while the session is active
+
+        Returns
+        -------
+        STEPControl.STEPControl_Writer
+
+        """
+        from OCC import STEPControl
+
+        writer = STEPControl.STEPControl_Writer()
+        writer.SetTolerance(self.tolerance)
+        return writer
+
+
+class IgesWriterSession(WriterSession):
+    r"""IGES writer session
+
+    Parameters
+    ----------
+    format : ["5.1", "5.3"]
+        5.3 writes solids as B-Rep entities (manifold solid B-Rep objects)
+
+    """
+
+    def __init__(self, format="5.1"):
+        if format not in iges_formats:
+            msg = "Unsupported IGES format"
+            logger.error(msg)
+            raise ValueError(msg)
+        super(IgesWriterSession, self).__init__()
+        self.format = format
+        self.brep_mode = format == "5.3"
+
+    def new_writer(self):
+        r"""A new IGES writer, to be called while the session is active
+
+        Returns
+        -------
+        IGESControl.IGESControl_Writer
+
+        """
+        from OCC import IGESControl
+
+        _init_iges_controller()
+        return IGESControl.IGESControl_Writer("write.iges.unit", self.brep_mode)
+
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""stats module of OCCDataExchange
+
+Summary
+-------
+
+Timings and counters of the conversions done by the importers and exporters.
+
+Every importer / exporter has a stats attribute (a ConversionStats instance). Its phases are timed with
+stats.phase(name) and its counters are incremented with stats.count(name). Once a file has been read or
+written, the stats are passed to the callbacks registered with register_stats_hook().
+
+Phases
+------
+read : parsing of the file (ReadFile)
+check : PrintCheckLoad / PrintCheckTransfer
+transfer : transfer of the roots to shapes (or of the shapes to the writer)
+compound : building of the compound
+index : indexing of the labels of an XCAF document (StepOcafImporter)
+add : adding shapes to an XCAF document (StepOcafExporter.add_shapes)
+write : writing of the file
+
+Counters
+--------
+roots, shapes, failed_transfers, bytes_read, bytes_written, cache_hits,
+duplicates (shapes added several times), instances (shapes sharing their geometry with others),
+parts, assemblies and components (StepOcafExporter)
+
+Memory profiling
+----------------
+Opt-in, with set_memory_profiling(True) for all the importers / exporters created afterwards or with
+importer.stats.profile_memory = True for a single one. The RSS of the process is sampled in a background
+thread during each phase and the Python allocations are traced with tracemalloc (Python >= 3.4).
+The peak and delta of each phase are stored in stats.memory, py_peak being relative to the traced memory
+at the start of the phase. rss_delta is None where only the peak RSS of the process can be measured
+(resource.getrusage fallback). A phase nested in a profiled phase is only timed.
+
+"""
+
+from __future__ import print_function
+
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+logger = logging.getLogger(__name__)
+
+_hooks = list()
+_profile_memory = False
+
+# interval between 2 RSS samples during a phase, in seconds
+RSS_SAMPLING_INTERVAL = 0.005
+
+
+def set_memory_profiling(enabled):
+    r"""Enable or disable the memory profiling of the importers / exporters created afterwards
+
+    Parameters
+    ----------
+    enabled : bool
+
+    """
+    global _profile_memory
+    _profile_memory = enabled
+
+
+def current_rss():
+    r"""Resident set size of the current process, in bytes
+
+    Returns
+    -------
+    int or None
+        None if it cannot be measured on this platform
+
+    """
+    return _read_rss()[0]
+
+
+def _read_rss():
+    r"""Resident set size of the current process, in bytes
+
+    Returns
+    -------
+    tuple
+        (rss, is_current) : rss is None if it cannot be measured, is_current is False if rss is the peak
+        RSS of the process so far rather than its current RSS
+
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), True
+    except (IOError, OSError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss, True
+    except ImportError:
+        pass
+    if resource is not None:
+        # peak RSS so far : kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (peak if sys.platform == "darwin" else peak * 1024), False
+    return None, False
+
+
+class _RssSampler(threading.Thread):
+    r"""Samples the RSS of the process until stopped, keeps the maximum"""
+
+    def __init__(self):
+        super(_RssSampler, self).__init__()
+        self.daemon = True
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLING_INTERVAL):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self._sample()
+
+
+def register_stats_hook(callback):
+    r"""Register a callback called with the ConversionStats of every file read or written
+
+    Parameters
+    ----------
+    callback : callable
+        Called with a ConversionStats instance, exceptions it raises are logged and ignored
+
+    """
+    if callback not in _hooks:
+        _hooks.append(callback)
+
+
+def unregister_stats_hook(callback):
+    r"""Unregister a callback registered with register_stats_hook()
+
+    Parameters
+    ----------
+    callback : callable
+
+    """
+    if callback in _hooks:
+        _hooks.remove(callback)
+
+
+class ConversionStats(object):
+    r"""Timings and counters of the conversions of an importer / exporter
+
+    Parameters
+    ----------
+    name : str
+        Name of the importer / exporter class
+    filename : str
+
+    """
+
+    def __init__(self, name, filename):
+        self.name = name
+        self.filename = filename
+        self.durations = dict()
+        self.counters = dict()
+        self.memory = dict()
+        self.profile_memory = _profile_memory
+        self._profiling = False  # a phase is being profiled
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        r"""Context manager timing a phase, durations of phases with the same name add up
+
+        Parameters
+        ----------
+        name : str
+
+        """
+        if self.profile_memory and not self._profiling:
+            profiling = self._profile_phase(name)
+        else:
+            profiling = _no_profiling()
+        start = time.time()
+        try:
+            with profiling:
+                yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.) + time.time() - start
+
+    @contextlib.contextmanager
+    def _profile_phase(self, name):
+        r"""Context manager measuring the RSS and Python allocations of a phase
+
+        For a phase run several times, the deltas add up and the peaks are the maximum of the runs.
+
+        """
+        self._profiling = True
+        started_tracing = False
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        if tracemalloc is not None:
+            if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            py_before = tracemalloc.get_traced_memory()[0]
+        rss_before, rss_before_is_current = _read_rss()
+        sampler = _RssSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            rss_after, rss_after_is_current = _read_rss()
+            if tracemalloc is not None:
+                py_after, py_peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+            else:
+                py_before = py_after = py_peak = None
+            self._profiling = False
+
+            memory = self.memory.setdefault(name, {"rss_peak": None, "rss_delta": 0,
+                                                   "py_peak": None, "py_delta": 0})
+            if sampler.peak is not None:
+                memory["rss_peak"] = max(memory["rss_peak"] or 0, sampler.peak)
+            if rss_before is None or rss_after is None or not (rss_before_is_current and rss_after_is_current):
+                memory["rss_delta"] = None
+            elif memory["rss_delta"] is not None:
+                memory["rss_delta"] += rss_after - rss_before
+            if py_peak is not None:
+                # relative to the memory traced before the phase, tracemalloc may have been started by the caller
+                memory["py_peak"] = max(memory["py_peak"] or 0, py_peak - py_before)
+                memory["py_delta"] += py_after - py_before
+
+    def count(self, name, value=1):
+        r"""Increment a counter
+
+        Parameters
+        ----------
+        name : str
+        value : int (optional)
+            The default is 1
+
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        r"""Log the stats and pass them to the registered hooks"""
+        logger.info("%s stats for %s : %s" % (self.name, self.filename, self.as_dict()))
+        for callback in list(_hooks):
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error("Stats hook %r failed : %s" % (callback, e))
+
+    def as_dict(self):
+        r"""Stats as a dict
+
+        Returns
+        -------
+        dict
+            name, filename, durations (seconds per phase), counters
+            and memory (bytes per phase, if profiled)
+
+        """
+        return {"name": self.name,
+                "filename": self.filename,
+                "durations": dict(self.durations),
+                "counters": dict(self.counters),
+                "memory": dict((name, dict(memory)) for name, memory in self.memory.items())}
+
+
+@contextlib.contextmanager
+def _no_profiling():
+    yield
@@ -6,20 +6,52 @@ r"""step module of OCCDataExchange"""
 from __future__ import print_function
 
 import logging
+import os
 import warnings
 
-from OCC import BRep
-from OCC import IFSelect
-from OCC import Interface
-from OCC import STEPControl
-from OCC import TopoDS
-from OCCUtils import types_lut
-
 from OCCDataExchange.checks import check_importer_filename, check_exporter_filename, check_overwrite, check_shape
 from OCCDataExchange.extensions import step_extensions
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.scan import StepScan, scan_step  # noqa: F401 (pure Python, usable without OCC from scan)
+from OCCDataExchange.sessions import StepWriterSession
+from OCCDataExchange.stats import ConversionStats
+from OCCDataExchange.utils import RootInfo, ShapeInstances, same_shapes, select_roots
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+BRep = lazy_import("OCC.BRep")
+IFSelect = lazy_import("OCC.IFSelect")
+STEPControl = lazy_import("OCC.STEPControl")
+StepBasic = lazy_import("OCC.StepBasic")
+TopoDS = lazy_import("OCC.TopoDS")
+types_lut = lazy_import("OCCUtils.types_lut")
+
+
+def _product_name(entity):
+    r"""Name of the product of a STEP root entity
+
+    Parameters
+    ----------
+    entity : Standard.Handle_Standard_Transient
+
+    Returns
+    -------
+    str or None
+        None if the root is not a product definition
+
+    """
+    product_definition = StepBasic.Handle_StepBasic_ProductDefinition.DownCast(entity)
+    if product_definition.IsNull():
+        return None
+    formation = product_definition.GetObject().Formation()
+    if formation.IsNull():
+        return None
+    product = formation.GetObject().OfProduct()
+    if product.IsNull() or product.GetObject().Name().IsNull():
+        return None
+    return product.GetObject().Name().GetObject().ToCString()
+
 
 class StepImporter(object):
     r"""STEP file importer
@@ -27,10 +59,18 @@ class StepImporter(object):
     Parameters
     ----------
     filename : str
+    cache : OCCDataExchange.cache.ShapeCache (optional)
+        If provided, the translated shapes are looked up in / stored to the cache
+    lazy : bool (optional)
+        If True, only the filename is checked at instantiation and the file is read
+        on first access to the results. The default is False (read at instantiation).
+    roots : iterable of int or callable (optional)
+        Indices (starting at 1) of the roots to transfer, or a predicate called with the
+        OCCDataExchange.utils.RootInfo of each root. The default (None) transfers all the roots.
 
     """
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, cache=None, lazy=False, roots=None):
         logger.info("StepImporter instantiated with filename : %s" % filename)
         self._shapes = list()
         self._number_of_shapes = 0
@@ -38,9 +78,64 @@ class StepImporter(object):
         check_importer_filename(filename, step_extensions)
 
         self._filename = filename
+        self._cache = cache
+        self._roots = roots if roots is None or callable(roots) else list(roots)
+        self._reader = None
+        self._compound = None
+        self._compound_shapes = list()
+        self._is_read = False
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+
+        if not lazy:
+            self._ensure_read()
+
+    def _ensure_read(self):
+        r"""Read the file if it has not been read yet"""
+        if not self._is_read:
+            logger.info("Reading file ....")
+            self.read_file()
+
+    def _load(self):
+        r"""Parse the file (without transferring any root) with a STEPControl_Reader
+
+        The reader is kept until the transfer so that list_roots() and read_file() parse the file only once
 
-        logger.info("Reading file ....")
-        self.read_file()
+        Returns
+        -------
+        STEPControl.STEPControl_Reader
+
+        """
+        if self._reader is None:
+            stepcontrol_reader = STEPControl.STEPControl_Reader()
+            with self.stats.phase("read"):
+                status = stepcontrol_reader.ReadFile(self._filename)
+            self.stats.count("bytes_read", os.path.getsize(self._filename))
+
+            if status != IFSelect.IFSelect_RetDone:
+                msg = "Status is not IFSelect.IFSelect_RetDone"
+                logger.error(msg)
+                raise ValueError(msg)
+
+            with self.stats.phase("check"):
+                stepcontrol_reader.PrintCheckLoad(False, IFSelect.IFSelect_ItemsByEntity)
+            self._reader = stepcontrol_reader
+        return self._reader
+
+    def list_roots(self):
+        r"""Describe the roots for transfer of the file, without transferring them
+
+        Returns
+        -------
+        list[OCCDataExchange.utils.RootInfo]
+
+        """
+        stepcontrol_reader = self._load()
+        root_infos = list()
+        for n in range(1, stepcontrol_reader.NbRootsForTransfer() + 1):
+            entity = stepcontrol_reader.RootForTransfer(n)
+            entity_type = entity.GetObject().DynamicType().GetObject().Name()
+            root_infos.append(RootInfo(n, entity_type, _product_name(entity)))
+        return root_infos
 
     # CONFUSING !! Comes from an assignment in ReadFile but looks like the len of shapes
     # @property
@@ -58,58 +153,93 @@ class StepImporter(object):
         """
         Read the STEP file and stores the result in a _shapes list
         """
-        stepcontrol_reader = STEPControl.STEPControl_Reader()
-        status = stepcontrol_reader.ReadFile(self._filename)
-
-        if status == IFSelect.IFSelect_RetDone:
-            stepcontrol_reader.PrintCheckLoad(False, IFSelect.IFSelect_ItemsByEntity)
-            nb_roots = stepcontrol_reader.NbRootsForTransfer()
-            logger.info("%i root(s)" % nb_roots)
-            if nb_roots == 0:
-                msg = "No root for transfer"
-                logger.error(msg)
-                raise ValueError(msg)
+        # a predicate can only be evaluated on the parsed file, its result cannot be cached
+        use_cache = self._cache is not None and not callable(self._roots)
+        if use_cache:
+            roots_key = None if self._roots is None else sorted(set(self._roots))
+            cache_key = self._cache.key(self._filename, importer="step", roots=roots_key)
+            shapes = self._cache.get(cache_key)
+            if shapes is not None:
+                logger.info("%i shape(s) found in cache" % len(shapes))
+                self._shapes = shapes
+                self.stats.count("cache_hits")
+                self.stats.count("shapes", len(shapes))
+                self.stats.report()
+                self._is_read = True
+                return True
+
+        stepcontrol_reader = self._load()
+
+        nb_roots = stepcontrol_reader.NbRootsForTransfer()
+        logger.info("%i root(s)" % nb_roots)
+        self.stats.count("roots", nb_roots)
+        if nb_roots == 0:
+            msg = "No root for transfer"
+            logger.error(msg)
+            raise ValueError(msg)
 
-            stepcontrol_reader.PrintCheckTransfer(False, IFSelect.IFSelect_ItemsByEntity)
+        if self._roots is None:
+            indices = range(1, nb_roots + 1)
+        else:
+            indices = select_roots(self.list_roots(), self._roots)
+            logger.info("%i root(s) selected for transfer" % len(indices))
 
-            self._number_of_shapes = stepcontrol_reader.NbShapes()
+        with self.stats.phase("check"):
+            stepcontrol_reader.PrintCheckTransfer(False, IFSelect.IFSelect_ItemsByEntity)
 
-            for n in range(1, nb_roots + 1):
+        # a single phase for all the roots rather than one per root, which is cheaper to profile
+        with self.stats.phase("transfer"):
+            for n in indices:
                 logger.info("Root index %i" % n)
+                nb_shapes_before = stepcontrol_reader.NbShapes()
                 ok = stepcontrol_reader.TransferRoot(n)
                 logger.info("TransferRoots status : %i" % ok)
 
                 if ok:
-                    # for i in range(1, self.nb_shapes + 1):
-                    a_shape = stepcontrol_reader.Shape(n)
-                    if a_shape.IsNull():
-                        msg = "At least one shape in IGES cannot be transferred"
-                        logger.warning(msg)
-                    else:
-                        self._shapes.append(a_shape)
-                        logger.info("Appending a %s to list of shapes" %
-                                    types_lut.topo_lut[a_shape.ShapeType()])
+                    # the shapes resulting from a transfer are appended to the shapes of the reader
+                    for i in range(nb_shapes_before + 1, stepcontrol_reader.NbShapes() + 1):
+                        a_shape = stepcontrol_reader.Shape(i)
+                        if a_shape.IsNull():
+                            msg = "At least one shape in STEP cannot be transferred"
+                            logger.warning(msg)
+                            self.stats.count("failed_transfers")
+                        else:
+                            self._shapes.append(a_shape)
+                            self.stats.count("shapes")
+                            logger.info("Appending a %s to list of shapes" %
+                                        types_lut.topo_lut[a_shape.ShapeType()])
                 else:
                     msg = "One shape could not be transferred"
                     logger.warning(msg)
                     warnings.warn(msg)
-            return True
-        else:
-            msg = "Status is not IFSelect.IFSelect_RetDone"
-            logger.error(msg)
-            raise ValueError(msg)
+                    self.stats.count("failed_transfers")
+
+        self._number_of_shapes = stepcontrol_reader.NbShapes()
+        self._reader = None  # release the STEP model
+
+        if use_cache:
+            self._cache.put(cache_key, self._shapes, os.path.getsize(self._filename))
+        self.stats.report()
+        self._is_read = True
+        return True
 
     @property
     def compound(self):
         """ Create and returns a compound from the _shapes list"""
-        # Create a compound
-        compound = TopoDS.TopoDS_Compound()
-        brep_builder = BRep.BRep_Builder()
-        brep_builder.MakeCompound(compound)
-        # Populate the compound
-        for shape in self._shapes:
-            brep_builder.Add(compound, shape)
-        return compound
+        self._ensure_read()
+        # The compound is only rebuilt if the shapes list has changed since it was last built
+        if self._compound is None or not same_shapes(self._compound_shapes, self._shapes):
+            with self.stats.phase("compound"):
+                # Create a compound
+                compound = TopoDS.TopoDS_Compound()
+                brep_builder = BRep.BRep_Builder()
+                brep_builder.MakeCompound(compound)
+                # Populate the compound
+                for shape in self._shapes:
+                    brep_builder.Add(compound, shape)
+            self._compound = compound
+            self._compound_shapes = list(self._shapes)
+        return self._compound
 
     @property
     def shapes(self):
@@ -120,8 +250,20 @@ class StepImporter(object):
         list[TopoDS.TopoDS_Shape]
 
         """
+        self._ensure_read()
         return self._shapes
 
+    def iter_shapes(self):
+        r"""Iterate over the shapes without building a compound
+
+        Returns
+        -------
+        iterator over TopoDS.TopoDS_Shape
+
+        """
+        self._ensure_read()
+        return iter(self._shapes)
+
 
 class StepExporter(object):
     r"""STEP file exporter
@@ -135,30 +277,37 @@ class StepExporter(object):
     schema : ["AP203", "AP214CD"]
         which STEP schema to use, either AP214CD or AP203
     tolerance : float
+    deduplicate : bool (optional)
+        If True, a shape added several times (same geometry, location and orientation) is written once,
+        and partner shapes (same geometry, different locations) are written as instances of an assembly
+        sharing their geometry. The file then has one root per group of partner shapes rather than one
+        per added shape, in the order of the first shape of each group. The default is False.
+    session : OCCDataExchange.sessions.StepWriterSession (optional)
+        Writer session to use, schema and tolerance are then ignored.
+        The default (None) creates a session of schema and tolerance.
 
     """
 
-    def __init__(self, filename, verbose=False, schema="AP214CD", tolerance=1e-4):
+    def __init__(self, filename, verbose=False, schema="AP214CD", tolerance=1e-4, deduplicate=False,
+                 session=None):
+        if session is None:
+            session = StepWriterSession(schema=schema, tolerance=tolerance)
         logger.info("StepExporter instantiated with filename : %s" % filename)
-        logger.info("StepExporter schema : %s" % schema)
-        logger.info("StepExporter tolerance : %s" % str(tolerance))
-
-        if schema not in ["AP203", "AP214CD"]:
-            msg = "Unsupported STEP schema"
-            logger.error(msg)
-            raise AssertionError(msg)
+        logger.info("StepExporter schema : %s" % session.schema)
+        logger.info("StepExporter tolerance : %s" % str(session.tolerance))
 
         check_exporter_filename(filename, step_extensions)
         check_overwrite(filename)
 
         self._filename = filename
         self._shapes = list()
+        self._instances = ShapeInstances() if deduplicate else None
         self.verbose = verbose
+        self.stats = ConversionStats(self.__class__.__name__, filename)
 
-        self._stepcontrol_writer = STEPControl.STEPControl_Writer()
-        self._stepcontrol_writer.SetTolerance(tolerance)
-
-        Interface.Interface_Static_SetCVal("write.step.schema", schema)
+        self._session = session
+        with session.activate():
+            self._stepcontrol_writer = session.new_writer()
 
     def add_shape(self, a_shape):
         r"""Add a shape to export
@@ -169,24 +318,58 @@ class StepExporter(object):
 
         """
         check_shape(a_shape)  # raises an exception if the shape is not valid
+        if self._instances is not None and not self._instances.add(a_shape):
+            logger.debug("Shape already added to the STEP exporter, ignored")
+            self.stats.count("duplicates")
+            return
         self._shapes.append(a_shape)
 
+    def _shapes_to_transfer(self):
+        r"""Shapes to transfer, partner shapes are grouped in a compound when deduplicating"""
+        if self._instances is None:
+            return self._shapes
+        shapes = list()
+        brep_builder = BRep.BRep_Builder()
+        for group in self._instances.groups:
+            if len(group) == 1:
+                shapes.append(group[0])
+                continue
+            compound = TopoDS.TopoDS_Compound()
+            brep_builder.MakeCompound(compound)
+            for shape in group:
+                brep_builder.Add(compound, shape)
+            shapes.append(compound)
+            self.stats.count("instances", len(group))
+        return shapes
+
     def write_file(self):
         r"""Write STEP file"""
-        for shp in self._shapes:
-            transfer_status = self._stepcontrol_writer.Transfer(shp, STEPControl.STEPControl_AsIs)
-            if transfer_status != IFSelect.IFSelect_RetDone:
-                msg = "An error occurred while transferring a shape to the STEP writer"
-                logger.error(msg)
-                raise ValueError(msg)
-
-        write_status = self._stepcontrol_writer.Write(self._filename)
+        shapes = self._shapes_to_transfer()
+        # write the compounds of partner shapes as assemblies, so that their geometry is written once
+        overrides = {"write.step.assembly": 1} if self._instances is not None else None
+        # the writing of the file may also read parameters (e.g. write.step.schema for the header),
+        # the session stays active until the file is written
+        with self._session.activate(overrides):
+            with self.stats.phase("transfer"):
+                for shp in shapes:
+                    transfer_status = self._stepcontrol_writer.Transfer(shp, STEPControl.STEPControl_AsIs)
+                    if transfer_status != IFSelect.IFSelect_RetDone:
+                        msg = "An error occurred while transferring a shape to the STEP writer"
+                        logger.error(msg)
+                        self.stats.count("failed_transfers")
+                        raise ValueError(msg)
+                    self.stats.count("shapes")
+
+            with self.stats.phase("write"):
+                write_status = self._stepcontrol_writer.Write(self._filename)
 
         if self.verbose:
             self._stepcontrol_writer.PrintStatsTransfer()
 
         if write_status == IFSelect.IFSelect_RetDone:
             logger.info("STEP file write successful.")
+            self.stats.count("bytes_written", os.path.getsize(self._filename))
+            self.stats.report()
         else:
             msg = "An error occurred while writing the STEP file"
             logger.error(msg)
@@ -5,26 +5,193 @@ r"""step_ocaf module of OCCDataExchange"""
 
 from __future__ import print_function
 
+import collections
 import logging
+import os
 
-from OCC import IFSelect
-from OCC import Quantity
-from OCC import STEPCAFControl
-from OCC import STEPControl
-from OCC import TCollection
-from OCC import TDF
-from OCC import TDocStd
-from OCC import TopAbs
-from OCC import XCAFApp
-from OCC import XCAFDoc
-from OCC import XSControl
-from OCCUtils.Topology import Topo
+try:
+    from sys import intern
+except ImportError:  # Python 2, intern is a builtin
+    pass
+
+try:
+    string_types = (str, unicode)
+except NameError:  # Python 3
+    string_types = (str,)
 
 from OCCDataExchange.checks import check_importer_filename, check_exporter_filename, check_overwrite, check_shape
 from OCCDataExchange.extensions import step_extensions
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.stats import ConversionStats
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+IFSelect = lazy_import("OCC.IFSelect")
+Quantity = lazy_import("OCC.Quantity")
+STEPCAFControl = lazy_import("OCC.STEPCAFControl")
+STEPControl = lazy_import("OCC.STEPControl")
+TCollection = lazy_import("OCC.TCollection")
+TColStd = lazy_import("OCC.TColStd")
+TDF = lazy_import("OCC.TDF")
+TDataStd = lazy_import("OCC.TDataStd")
+TDocStd = lazy_import("OCC.TDocStd")
+TopAbs = lazy_import("OCC.TopAbs")
+TopLoc = lazy_import("OCC.TopLoc")
+XCAFApp = lazy_import("OCC.XCAFApp")
+XCAFDoc = lazy_import("OCC.XCAFDoc")
+XSControl = lazy_import("OCC.XSControl")
+Topology = lazy_import("OCCUtils.Topology")
+
+LabelInfo = collections.namedtuple("LabelInfo", ["entry", "label", "shape", "color", "layer_ids", "name", "is_free"])
+LabelInfo.__doc__ = r"""Shape label of an XCAF document, as indexed by StepOcafImporter
+
+entry : label entry (e.g. "0:1:1:1"), key of StepOcafImporter.label_index
+label : TDF_Label
+shape : TopoDS_Shape
+color : surface color (Quantity_Color) or None
+layer_ids : indices of the layers in StepOcafImporter.layer_names
+name : name of the label, None if it has no name
+is_free : True if the shape is not a component of an assembly
+"""
+
+
+def _label_entry(label):
+    r"""Entry of a label, e.g. "0:1:1:1"
+
+    Parameters
+    ----------
+    label : TDF_Label
+
+    Returns
+    -------
+    str
+
+    """
+    entry = TCollection.TCollection_AsciiString()
+    TDF.TDF_Tool_Entry(label, entry)
+    return entry.ToCString()
+
+
+def _first(values, is_set):
+    r"""First value of values for which is_set(value) is true, the last value if none"""
+    for value in values:
+        if is_set(value):
+            return value
+    return values[-1]
+
+
+def _extended_string_to_str(extended_string):
+    r"""Python string of a TCollection_ExtendedString"""
+    return "".join(chr(extended_string.Value(k)) for k in range(1, extended_string.Length() + 1))
+
+
+class OcafTable(object):
+    r"""Columnar metadata of the shapes of a StepOcafImporter
+
+    Row i describes StepOcafImporter.shapes[i].
+
+    Parameters
+    ----------
+    rgb : numpy.ndarray
+        (N, 3) float array of the colors, NaN for a shape without color
+    layer_names : list[str]
+        Interned layer names, layer ids are indices in this list
+    layer_offsets : numpy.ndarray
+        (N + 1,) int array, the layer ids of shape i are layer_ids[layer_offsets[i]:layer_offsets[i + 1]]
+    layer_ids : numpy.ndarray
+        int array
+    names : list[str or None]
+        Names of the labels of the shapes
+    entries : list[str]
+        Entries of the labels of the shapes (keys of StepOcafImporter.label_index)
+
+    """
+
+    def __init__(self, rgb, layer_names, layer_offsets, layer_ids, names, entries):
+        import numpy as np
+
+        self.shape_ids = np.arange(len(rgb))
+        self.rgb = rgb
+        self.layer_names = layer_names
+        self.layer_offsets = layer_offsets
+        self.layer_ids = layer_ids
+        self.names = names
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.shape_ids)
+
+    def layer_ids_of(self, shape_id):
+        r"""Layer ids of a shape
+
+        Parameters
+        ----------
+        shape_id : int
+
+        Returns
+        -------
+        numpy.ndarray
+
+        """
+        return self.layer_ids[self.layer_offsets[shape_id]:self.layer_offsets[shape_id + 1]]
+
+    def layers_of(self, shape_id):
+        r"""Layer names of a shape
+
+        Parameters
+        ----------
+        shape_id : int
+
+        Returns
+        -------
+        list[str]
+
+        """
+        return [self.layer_names[i] for i in self.layer_ids_of(shape_id)]
+
+    def on_layer(self, layer_name):
+        r"""Shapes on a layer
+
+        Parameters
+        ----------
+        layer_name : str
+
+        Returns
+        -------
+        numpy.ndarray
+            (N,) bool array
+
+        """
+        import numpy as np
+
+        mask = np.zeros(len(self), dtype=bool)
+        if layer_name in self.layer_names:
+            rows = np.repeat(self.shape_ids, np.diff(self.layer_offsets))
+            mask[rows[self.layer_ids == self.layer_names.index(layer_name)]] = True
+        return mask
+
+    def with_color(self, r, g, b, tolerance=1e-6):
+        r"""Shapes of a color
+
+        Parameters
+        ----------
+        r, g, b : float
+            Color components, between 0. and 1.
+        tolerance : float (optional)
+            Maximum difference of each component. The default is 1e-6.
+
+        Returns
+        -------
+        numpy.ndarray
+            (N,) bool array, False for the shapes without color
+
+        """
+        import numpy as np
+
+        with np.errstate(invalid="ignore"):  # NaN of the shapes without color
+            return np.all(np.abs(self.rgb - np.array([r, g, b])) <= tolerance, axis=1)
+
 
 class StepOcafImporter(object):
     r"""Imports STEP file that support layers & colors"""
@@ -39,7 +206,13 @@ class StepOcafImporter(object):
         # to the color and layer at index i in their respective lists
         self._shapes = list()
         self._colors = list()
-        self._layers = list()
+        self._layers = None
+        self._label_index = collections.OrderedDict()
+        self._table = None
+        self._layer_names = list()
+        self._layer_entry_ids = dict()
+        self._layers_str = None
+        self.stats = ConversionStats(self.__class__.__name__, filename)
 
         self.read_file()
 
@@ -50,14 +223,60 @@ class StepOcafImporter(object):
 
     @property
     def colors(self):
-        r"""Colors"""
+        r"""Colors, a Quantity_Color per shape or None for a shape without color"""
         return self._colors
 
     @property
     def layers(self):
-        r"""Layers"""
+        r"""Layers, a Handle_TColStd_HSequenceOfExtendedString of layer names per shape
+
+        The sequences are built from the layer table on first access.
+
+        """
+        if self._layers is None:
+            self._layers = list()
+            for i in range(len(self._table)):
+                sequence = TColStd.TColStd_HSequenceOfExtendedString()
+                for layer_name in self._table.layers_of(i):
+                    sequence.Append(TCollection.TCollection_ExtendedString(layer_name))
+                self._layers.append(sequence.GetHandle())
         return self._layers
 
+    @property
+    def label_index(self):
+        r"""Shape labels of the document
+
+        Returns
+        -------
+        collections.OrderedDict
+            label entry (str) -> LabelInfo, in the order of the document
+
+        """
+        return self._label_index
+
+    @property
+    def table(self):
+        r"""Columnar metadata of the shapes, row i describes shapes[i]
+
+        Returns
+        -------
+        OcafTable
+
+        """
+        return self._table
+
+    @property
+    def layer_names(self):
+        r"""Names of the layers of the document, decoded once and interned
+
+        Returns
+        -------
+        list[str]
+            The layer ids of LabelInfo and OcafTable are indices in this list
+
+        """
+        return self._layer_names
+
     @property
     def layers_str(self):
         r"""Returns a readable list of layers in the same order as self._shapes
@@ -70,21 +289,14 @@ class StepOcafImporter(object):
         examples/export_multi_to_step_colors_layers_ocaf.py
 
         """
-        layer_string_list = list()
-        for i, layer in enumerate(self._layers):
-            string = ""
-            for j in range(1, layer.GetObject().Length() + 1):
-                extended_string = layer.GetObject().Value(j)
-
-                for k in range(1, extended_string.Length() + 1):
-                    ascii_code = extended_string.Value(k)
-                    string += (chr(ascii_code))
-
-            layer_string_list.append(string)
-        return layer_string_list
+        if self._layers_str is None:
+            self._layers_str = ["".join(self._table.layers_of(i)) for i in range(len(self._table))]
+        return list(self._layers_str)
 
     def read_file(self):
         r"""Read file"""
+        import numpy as np
+
         logger.info("Reading STEP file")
         h_doc = TDocStd.Handle_TDocStd_Document()
 
@@ -105,65 +317,184 @@ class StepOcafImporter(object):
         step_reader.SetNameMode(True)
         step_reader.SetMatMode(True)
 
-        status = step_reader.ReadFile(self.filename)
+        with self.stats.phase("read"):
+            status = step_reader.ReadFile(self.filename)
+        self.stats.count("bytes_read", os.path.getsize(self.filename))
 
         if status == IFSelect.IFSelect_RetDone:
             logger.info("Transfer doc to STEPCAFControl_Reader")
-            step_reader.Transfer(doc.GetHandle())
+            with self.stats.phase("transfer"):
+                step_reader.Transfer(doc.GetHandle())
         else:
             raise ValueError("could not read {}".format(self.filename))
 
-        labels = TDF.TDF_LabelSequence()
-        color_labels = TDF.TDF_LabelSequence()
-        # TopoDS_Shape a_shape;
-        h_shape_tool.GetFreeShapes(labels)
-        h_shape_tool.GetShapes(labels)
-
-        logger.info('Number of shapes at root :%i' % labels.Length())
-
-        # for i in range(labels.Length()):
-        #     a_shape = h_shape_tool.GetObject().GetShape(labels.Value(i+1))
-        #     logger.debug("%i - type : %s" % (i, a_shape.ShapeType()))
-        #     sub_shapes_labels = TDF.TDF_LabelSequence()
-        #     print("Is Assembly?", shape_tool.IsAssembly(labels.Value(i + 1)))
-        #     # sub_shapes = shape_tool.getsubshapes(labels.Value(i+1), sub_shapes_labels)
-        #
-        #     sub_shapes = shape_tool.FindSubShape(labels.Value(i + 1), a_shape, labels.Value(i + 1))
-        #     print('Number of subshapes in the assembly : %i' % sub_shapes_labels.Length())
-        #
-        # color_tool.GetObject().GetColors(color_labels)
-        # logger.info('Number of colors : %i' % color_labels.Length())
-
-        for i in range(labels.Length()):
-            # print i
-            label = labels.Value(i + 1)
-            logger.debug("Label : %s" % label)
-            a_shape = h_shape_tool.GetShape(labels.Value(i + 1))
-
-            # string_seq = TColStd.TColStd_HSequenceOfExtendedString()
-            # string_seq is an TColStd.TColStd_HSequenceOfExtendedString
-            string_seq = layer_tool.GetLayers(a_shape)
-            color = Quantity.Quantity_Color()
-            c = color_tool.GetColor(a_shape, XCAFDoc.XCAFDoc_ColorSurf, color)
-
-            logger.info("The shape type is : %i" % a_shape.ShapeType())
-            if a_shape.ShapeType() == TopAbs.TopAbs_COMPOUND:
-                logger.info("The shape type is TopAbs.TopAbs_COMPOUND")
-                topo = Topo(a_shape)
-                logger.info("Nb of compounds : %i" % topo.number_of_compounds)
-                logger.info("Nb of solids : %i" % topo.number_of_solids)
-                logger.info("Nb of shells : %i" % topo.number_of_shells)
-                for solid in topo.solids:
-                    logger.info("Adding solid to the shapes list")
-                    self._shapes.append(solid)
-            elif a_shape.ShapeType() == TopAbs.TopAbs_SOLID:
-                logger.info("The shape type is TopAbs.TopAbs_SOLID")
-                self._shapes.append(a_shape)
-                self._colors.append(color)
-                self._layers.append(string_seq)
-
+        with self.stats.phase("index"):
+            self._index_labels(h_shape_tool, color_tool, layer_tool)
+        logger.info('Number of shapes at root :%i' % len(self._label_index))
+        self.stats.count("roots", len(self._label_index))
+
+        # the parts of assemblies are not free, their located instances are found by walking the free assemblies
+        columns = {"rgb": list(), "layer_offsets": [0], "layer_ids": list(), "names": list(), "entries": list()}
+        for info in self._label_index.values():
+            if info.is_free:
+                self._add_label(h_shape_tool, color_tool, layer_tool, info.label, None, (None, (), None),
+                                (None, ()), columns)
+
+        self._table = OcafTable(rgb=np.array(columns["rgb"], dtype=np.float64).reshape(-1, 3),
+                                layer_names=self._layer_names,
+                                layer_offsets=np.array(columns["layer_offsets"], dtype=np.int64),
+                                layer_ids=np.array(columns["layer_ids"], dtype=np.int64),
+                                names=columns["names"],
+                                entries=columns["entries"])
+
+        self.stats.count("shapes", len(self._shapes))
+        self.stats.report()
         return True
 
+    def _add_label(self, shape_tool, color_tool, layer_tool, label, location, component, inherited, columns):
+        r"""Append the solids of a shape label, the components of an assembly are walked recursively
+
+        The color and layers of a solid are the ones of the component referring to its part, or else the ones
+        of the part, or else the ones of the enclosing assemblies.
+
+        Parameters
+        ----------
+        shape_tool : XCAFDoc_ShapeTool
+        color_tool : XCAFDoc_ColorTool
+        layer_tool : XCAFDoc_LayerTool
+        label : TDF_Label
+            Free shape label, or part / sub-assembly label referred by a component
+        location : TopLoc_Location or None
+            Composed location of the components leading to the label, None for a free label
+        component : tuple
+            (color, layer ids, name) of the component referring to the label
+        inherited : tuple
+            (color, layer ids) of the enclosing assemblies
+        columns : dict
+            Columns of the OcafTable being built
+
+        """
+        info = self._label_index.get(_label_entry(label))
+        if info is None:
+            logger.warning("Component referring to an unknown shape label, ignored")
+            return
+        color = _first([component[0], info.color, inherited[0]], lambda value: value is not None)
+        layer_ids = _first([component[1], info.layer_ids, inherited[1]], len)
+        name = _first([component[2], info.name], lambda value: value is not None)
+
+        if shape_tool.IsAssembly(label):
+            components = TDF.TDF_LabelSequence()
+            shape_tool.GetComponents(label, components)
+            for i in range(1, components.Length() + 1):
+                component_label = components.Value(i)
+                referred_label = TDF.TDF_Label()
+                if not shape_tool.GetReferredShape(component_label, referred_label):
+                    continue
+                component_location = shape_tool.GetLocation(component_label)
+                if location is not None:
+                    component_location = location.Multiplied(component_location)
+                self._add_label(shape_tool, color_tool, layer_tool, referred_label, component_location,
+                                self._label_metadata(component_label, color_tool, layer_tool), (color, layer_ids),
+                                columns)
+            return
+
+        a_shape = info.shape if location is None else info.shape.Moved(location)
+        logger.debug("The shape type is : %i" % a_shape.ShapeType())
+        if a_shape.ShapeType() == TopAbs.TopAbs_COMPOUND:
+            topo = Topology.Topo(a_shape)
+            logger.debug("Nb of compounds : %i" % topo.number_of_compounds())
+            logger.debug("Nb of solids : %i" % topo.number_of_solids())
+            logger.debug("Nb of shells : %i" % topo.number_of_shells())
+            # the solids of a compound get the color and layers of the compound
+            solids = list(topo.solids())
+        elif a_shape.ShapeType() == TopAbs.TopAbs_SOLID:
+            solids = [a_shape]
+        else:
+            return
+
+        if color is not None:
+            label_rgb = (color.Red(), color.Green(), color.Blue())
+        else:
+            label_rgb = (float("nan"),) * 3
+        for solid in solids:
+            self._shapes.append(solid)
+            self._colors.append(color)
+            columns["rgb"].append(label_rgb)
+            columns["layer_ids"].extend(layer_ids)
+            columns["layer_offsets"].append(len(columns["layer_ids"]))
+            columns["names"].append(name)
+            columns["entries"].append(info.entry)
+
+    def _label_metadata(self, label, color_tool, layer_tool):
+        r"""Color, layer ids and name of a label
+
+        Returns
+        -------
+        tuple
+            (Quantity_Color or None, tuple of layer ids, str or None)
+
+        """
+        color = Quantity.Quantity_Color()
+        if not (color_tool.GetColor(label, XCAFDoc.XCAFDoc_ColorSurf, color) or
+                color_tool.GetColor(label, XCAFDoc.XCAFDoc_ColorGen, color)):
+            color = None
+        shape_layer_labels = TDF.TDF_LabelSequence()
+        layer_tool.GetLayers(label, shape_layer_labels)
+        layer_ids = tuple(self._layer_entry_ids[_label_entry(shape_layer_labels.Value(j))]
+                          for j in range(1, shape_layer_labels.Length() + 1))
+        return color, layer_ids, label.GetLabelName() or None
+
+    def _index_labels(self, shape_tool, color_tool, layer_tool):
+        r"""Index the top level shape labels of the document, in a single traversal
+
+        GetShapes() already returns the free shapes, each label is visited once. The colors, layers
+        and names are looked up from the label rather than from the shape, which would search the
+        whole document for the label of the shape.
+
+        Parameters
+        ----------
+        shape_tool : XCAFDoc_ShapeTool
+        color_tool : XCAFDoc_ColorTool
+        layer_tool : XCAFDoc_LayerTool
+
+        """
+        free_labels = TDF.TDF_LabelSequence()
+        shape_tool.GetFreeShapes(free_labels)
+        free_entries = set(_label_entry(free_labels.Value(i)) for i in range(1, free_labels.Length() + 1))
+
+        # each layer name is decoded once, the shape labels refer to the layers by id
+        layer_labels = TDF.TDF_LabelSequence()
+        layer_tool.GetLayerLabels(layer_labels)
+        self._layer_names = list()
+        name_ids = dict()
+        self._layer_entry_ids = dict()  # layer label entry -> layer id
+        for i in range(1, layer_labels.Length() + 1):
+            layer_label = layer_labels.Value(i)
+            extended_string = TCollection.TCollection_ExtendedString()
+            layer_tool.GetLayer(layer_label, extended_string)
+            layer_name = intern(_extended_string_to_str(extended_string))
+            if layer_name not in name_ids:
+                name_ids[layer_name] = len(self._layer_names)
+                self._layer_names.append(layer_name)
+            self._layer_entry_ids[_label_entry(layer_label)] = name_ids[layer_name]
+
+        labels = TDF.TDF_LabelSequence()
+        shape_tool.GetShapes(labels)
+        self._label_index = collections.OrderedDict()
+        for i in range(1, labels.Length() + 1):
+            label = labels.Value(i)
+            entry = _label_entry(label)
+            if entry in self._label_index:
+                continue
+            color, layer_ids, name = self._label_metadata(label, color_tool, layer_tool)
+            self._label_index[entry] = LabelInfo(entry=entry,
+                                                 label=label,
+                                                 shape=shape_tool.GetShape(label),
+                                                 color=color,
+                                                 layer_ids=layer_ids,
+                                                 name=name,
+                                                 is_free=entry in free_entries)
+
 
 class StepOcafExporter(object):
     r"""STEP export that support layers & colors"""
@@ -195,6 +526,8 @@ class StepOcafExporter(object):
         self.current_color = Quantity.Quantity_Color(Quantity.Quantity_NOC_RED)
         self.current_layer = self.layers.AddLayer(TCollection.TCollection_ExtendedString(layer_name))
         self.layer_names = {}
+        self._color_labels = dict()  # (r, g, b) -> color label, each distinct color is added once
+        self.stats = ConversionStats(self.__class__.__name__, filename)
 
     def set_color(self, r=1, g=1, b=1, color=None):
         r"""Set color
@@ -224,11 +557,21 @@ class StepOcafExporter(object):
             name of the layer
 
         """
-        if layer_name in self.layer_names:
-            self.current_layer = self.layer_names[layer_name]
-        else:
-            self.current_layer = self.layers.AddLayer(TCollection.TCollection_ExtendedString(layer_name))
-            self.layer_names[layer_name] = self.current_layer
+        self.current_layer = self._layer_label(layer_name)
+
+    def _layer_label(self, layer_name):
+        r"""Label of a layer, the layer is added on first use"""
+        if layer_name not in self.layer_names:
+            self.layer_names[layer_name] = self.layers.AddLayer(TCollection.TCollection_ExtendedString(layer_name))
+        return self.layer_names[layer_name]
+
+    def _color_label(self, r, g, b):
+        r"""Label of a color, the color is added on first use"""
+        key = (float(r), float(g), float(b))
+        if key not in self._color_labels:
+            self._color_labels[key] = self.colors.AddColor(Quantity.Quantity_Color(key[0], key[1], key[2],
+                                                                                   Quantity.Quantity_TOC_RGB))
+        return self._color_labels[key]
 
     def add_shape(self, shape, color=None, layer=None):
         r"""add a shape to export
@@ -251,17 +594,19 @@ class StepOcafExporter(object):
         check_shape(shape)  # raises an exception if the shape is not valid
 
         shp_label = self.shape_tool.AddShape(shape)
+        self.stats.count("shapes")
 
-        if color is None:
-            self.colors.SetColor(shp_label, self.current_color, XCAFDoc.XCAFDoc_ColorGen)
-        else:
+        if color is not None:
             if isinstance(color, Quantity.Quantity_Color):
                 self.current_color = color
             else:
                 assert len(color) == 3, 'expected a tuple with three values < 1.'
                 r, g, b = color
                 self.set_color(r, g, b)
-            self.colors.SetColor(shp_label, self.current_color, XCAFDoc.XCAFDoc_ColorGen)
+        current_color = self.current_color
+        self.colors.SetColor(shp_label,
+                             self._color_label(current_color.Red(), current_color.Green(), current_color.Blue()),
+                             XCAFDoc.XCAFDoc_ColorGen)
 
         if layer is None:
             self.layers.SetLayer(shp_label, self.current_layer)
@@ -269,21 +614,165 @@ class StepOcafExporter(object):
             self.set_layer(layer)
             self.layers.SetLayer(shp_label, self.current_layer)
 
+    def add_shapes(self, shapes, colors=None, layers=None):
+        r"""Add many shapes to export
+
+        Identical colors and layers are created once in the document and shared by the shapes.
+        Unlike add_shape(), the current color and layer are not changed.
+
+        Parameters
+        ----------
+        shapes : list[TopoDS_Shape]
+        colors : optional
+            None (the current color), a single (r, g, b) color or Quantity_Color, a (N, 3) array of colors
+            or a list of N Quantity_Color
+        layers : optional
+            None (the current layer), a single layer name or a list of N layer names
+
+        """
+        import numpy as np
+
+        shapes = list(shapes)
+        nb_shapes = len(shapes)
+        for shape in shapes:
+            check_shape(shape)  # raises an exception if the shape is not valid
+
+        if colors is None:
+            colors = [self.current_color]
+        elif isinstance(colors, Quantity.Quantity_Color):
+            colors = [colors]
+        if len(colors) > 0 and isinstance(colors[0], Quantity.Quantity_Color):
+            rgb = np.array([(c.Red(), c.Green(), c.Blue()) for c in colors], dtype=np.float64)
+        else:
+            rgb = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        if layers is None or isinstance(layers, string_types):
+            layers = [layers]
+
+        for name, values in [("colors", rgb), ("layers", layers)]:
+            if len(values) not in (1, nb_shapes):
+                msg = "Expecting 1 or %i %s, got %i" % (nb_shapes, name, len(values))
+                logger.error(msg)
+                raise ValueError(msg)
+
+        # one label per distinct color and layer
+        unique_rgb, color_indices = np.unique(rgb, axis=0, return_inverse=True)
+        color_labels = [self._color_label(r, g, b) for r, g, b in unique_rgb.tolist()]
+        layer_labels = [self.current_layer if layer is None else self._layer_label(layer) for layer in layers]
+        color_indices = color_indices.reshape(-1).tolist()
+
+        with self.stats.phase("add"):
+            for i, shape in enumerate(shapes):
+                shp_label = self.shape_tool.AddShape(shape)
+                self.colors.SetColor(shp_label, color_labels[color_indices[i if len(rgb) > 1 else 0]],
+                                     XCAFDoc.XCAFDoc_ColorGen)
+                self.layers.SetLayer(shp_label, layer_labels[i if len(layer_labels) > 1 else 0])
+        self.stats.count("shapes", nb_shapes)
+
+    def _set_name(self, label, name):
+        r"""Set the name of a label, if name is not None"""
+        if name is not None:
+            TDataStd.TDataStd_Name_Set(label, TCollection.TCollection_ExtendedString(name))
+
+    def add_part(self, shape, color=None, layer=None, name=None):
+        r"""Register the geometry of a part, to be placed with add_instance()
+
+        A part that is never instantiated is written as a standalone shape.
+
+        Parameters
+        ----------
+        shape : TopoDS_Shape
+        color : optional
+            (r, g, b) tuple or Quantity_Color, the default (None) uses the current color
+        layer : str (optional)
+            The default (None) uses the current layer
+        name : str (optional)
+
+        Returns
+        -------
+        TDF_Label
+            Label of the part
+
+        """
+        check_shape(shape)  # raises an exception if the shape is not valid
+
+        part_label = self.shape_tool.AddShape(shape, False)
+        if color is None:
+            color = self.current_color
+        if isinstance(color, Quantity.Quantity_Color):
+            color = (color.Red(), color.Green(), color.Blue())
+        self.colors.SetColor(part_label, self._color_label(*color), XCAFDoc.XCAFDoc_ColorGen)
+        self.layers.SetLayer(part_label, self.current_layer if layer is None else self._layer_label(layer))
+        self._set_name(part_label, name)
+        self.stats.count("parts")
+        return part_label
+
+    def new_assembly(self, name=None):
+        r"""Create an empty assembly, to be filled with add_instance()
+
+        An assembly that is not itself instantiated in another assembly is a root of the file.
+
+        Parameters
+        ----------
+        name : str (optional)
+
+        Returns
+        -------
+        TDF_Label
+            Label of the assembly
+
+        """
+        assembly_label = self.shape_tool.NewShape()
+        self._set_name(assembly_label, name)
+        self.stats.count("assemblies")
+        return assembly_label
+
+    def add_instance(self, assembly, part, location=None):
+        r"""Place a part or a sub-assembly in an assembly
+
+        The geometry of the part is written once, whatever its number of instances.
+
+        Parameters
+        ----------
+        assembly : TDF_Label
+            Label returned by new_assembly()
+        part : TDF_Label
+            Label returned by add_part() or new_assembly()
+        location : gp_Trsf or TopLoc_Location (optional)
+            The default (None) is the identity
+
+        Returns
+        -------
+        TDF_Label
+            Label of the component
+
+        """
+        if location is None:
+            location = TopLoc.TopLoc_Location()
+        elif not isinstance(location, TopLoc.TopLoc_Location):
+            location = TopLoc.TopLoc_Location(location)
+        component_label = self.shape_tool.AddComponent(assembly, part, location)
+        self.stats.count("components")
+        return component_label
+
     def write_file(self):
         r"""Write file"""
         work_session = XSControl.XSControl_WorkSession()
         writer = STEPCAFControl.STEPCAFControl_Writer(work_session.GetHandle(), False)
 
-        transfer_status = writer.Transfer(self.h_doc, STEPControl.STEPControl_AsIs)
+        with self.stats.phase("transfer"):
+            transfer_status = writer.Transfer(self.h_doc, STEPControl.STEPControl_AsIs)
         if transfer_status != IFSelect.IFSelect_RetDone:
             msg = "An error occurred while transferring a shape to the STEP writer"
             logger.error(msg)
             raise ValueError(msg)
         logger.info('Writing STEP file')
 
-        write_status = writer.Write(self.filename)
+        with self.stats.phase("write"):
+            write_status = writer.Write(self.filename)
         if write_status == IFSelect.IFSelect_RetDone:
             logger.info("STEP file write successful.")
+            self.stats.count("bytes_written", os.path.getsize(self.filename))
+            self.stats.report()
         else:
             msg = "An error occurred while writing the STEP file"
             logger.error(msg)
@@ -6,15 +6,265 @@ r"""STL module of OCCDataExchange"""
 from __future__ import print_function
 
 import logging
-
-from OCC import StlAPI
-from OCC import TopoDS
+import os
+import re
 
 from OCCDataExchange.checks import check_importer_filename, check_exporter_filename, check_overwrite, check_shape
 from OCCDataExchange.extensions import stl_extensions
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.stats import ConversionStats
 
 logger = logging.getLogger(__name__)
 
+# OCC modules are imported on first use
+BRep = lazy_import("OCC.BRep")
+BRepBuilderAPI = lazy_import("OCC.BRepBuilderAPI")
+BRepMesh = lazy_import("OCC.BRepMesh")
+StlAPI = lazy_import("OCC.StlAPI")
+TopAbs = lazy_import("OCC.TopAbs")
+TopExp = lazy_import("OCC.TopExp")
+TopLoc = lazy_import("OCC.TopLoc")
+TopoDS = lazy_import("OCC.TopoDS")
+gp = lazy_import("OCC.gp")
+
+# layout of a triangle in a binary STL file, after the 80 bytes header and the uint32 number of triangles
+# (numpy is imported on first use, like OCC)
+_stl_binary_fields = [("normal", "<f4", (3,)),
+                      ("vertices", "<f4", (3, 3)),
+                      ("attribute", "<u2")]
+
+_stl_float = r"\s+([-+0-9.eEnNaAiIfF]+)"
+_stl_vertex_regex = re.compile((r"vertex" + _stl_float * 3).encode("ascii"))
+_stl_normal_regex = re.compile((r"facet\s+normal" + _stl_float * 3).encode("ascii"))
+
+
+class StlMesh(object):
+    r"""Triangle mesh read from a STL file
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        (N, 3) float array of vertex coordinates
+    faces : numpy.ndarray
+        (F, 3) int array of indices into vertices
+    normals : numpy.ndarray
+        (F, 3) float array of facet normals, as stored in the file
+
+    """
+
+    def __init__(self, vertices, faces, normals):
+        self.vertices = vertices
+        self.faces = faces
+        self.normals = normals
+
+    @property
+    def nb_triangles(self):
+        r"""Number of triangles"""
+        return len(self.faces)
+
+    def to_shape(self):
+        r"""Build a TopoDS_Shape made of one face per triangle, the same way StlAPI_Reader does
+
+        Returns
+        -------
+        TopoDS.TopoDS_Shape
+
+        """
+        topo_vertices = [BRepBuilderAPI.BRepBuilderAPI_MakeVertex(gp.gp_Pnt(float(x), float(y), float(z))).Vertex()
+                         for x, y, z in self.vertices]
+        brep_builder = BRep.BRep_Builder()
+        shell = TopoDS.TopoDS_Shell()
+        brep_builder.MakeShell(shell)
+        for i, j, k in self.faces:
+            if i == j or j == k or k == i:  # degenerated triangle
+                continue
+            polygon = BRepBuilderAPI.BRepBuilderAPI_MakePolygon(topo_vertices[i], topo_vertices[j],
+                                                                topo_vertices[k], True)
+            if not polygon.IsDone():
+                continue
+            face = BRepBuilderAPI.BRepBuilderAPI_MakeFace(polygon.Wire())
+            if face.IsDone():
+                brep_builder.Add(shell, face.Face())
+
+        sewing = BRepBuilderAPI.BRepBuilderAPI_Sewing()
+        sewing.Init(1.0e-06, True)
+        sewing.Load(shell)
+        sewing.Perform()
+        shape = sewing.SewedShape()
+        if shape.IsNull():
+            return shell
+        return shape
+
+
+def _read_stl_triangles(filename, mmap=False):
+    r"""Read the triangles of a binary or ASCII STL file
+
+    Returns
+    -------
+    tuple(numpy.ndarray, numpy.ndarray)
+        (F, 3, 3) vertex coordinates and (F, 3) normals of the triangles
+
+    """
+    import numpy as np
+
+    stl_binary_dtype = np.dtype(_stl_binary_fields)
+    size = os.path.getsize(filename)
+    nb_triangles = None
+    if size >= 84:
+        with open(filename, "rb") as f:
+            f.seek(80)
+            nb_triangles = int(np.fromfile(f, dtype="<u4", count=1)[0])
+
+    # a binary file size is fully determined by its number of triangles, ASCII files may start with "solid" or not
+    if nb_triangles is not None and size == 84 + nb_triangles * stl_binary_dtype.itemsize:
+        logger.info("Binary STL file with %i triangles" % nb_triangles)
+        if mmap:
+            data = np.memmap(filename, dtype=stl_binary_dtype, mode="r", offset=84, shape=(nb_triangles,))
+        else:
+            with open(filename, "rb") as f:
+                f.seek(84)
+                data = np.fromfile(f, dtype=stl_binary_dtype, count=nb_triangles)
+        return data["vertices"], data["normal"]
+
+    with open(filename, "rb") as f:
+        text = f.read()
+    vertices = np.array(_stl_vertex_regex.findall(text), dtype=np.float32).reshape(-1, 3, 3)
+    normals = np.array(_stl_normal_regex.findall(text), dtype=np.float32).reshape(-1, 3)
+    if len(normals) != len(vertices):
+        msg = "Inconsistent number of facets and vertices in ASCII STL file"
+        logger.error(msg)
+        raise ValueError(msg)
+    logger.info("ASCII STL file with %i triangles" % len(vertices))
+    return vertices, normals
+
+
+def read_stl_mesh(filename, mmap=False, merge_vertices=None):
+    r"""Read a binary or ASCII STL file into numpy arrays, without building any TopoDS_Shape
+
+    Parameters
+    ----------
+    filename : str
+    mmap : bool (optional)
+        Memory map binary files instead of reading them (default is False)
+    merge_vertices : bool (optional)
+        If True, identical vertices are merged. If False, each triangle has its own 3 vertices.
+        The default (None) merges the vertices unless mmap is True : merging sorts all the vertices
+        in memory, which defeats the memory mapping of large files.
+
+    Returns
+    -------
+    StlMesh
+
+    """
+    import numpy as np
+
+    triangles, normals = _read_stl_triangles(filename, mmap)
+    if len(triangles) == 0:
+        msg = "No triangle in STL file %s" % filename
+        logger.error(msg)
+        raise ValueError(msg)
+
+    points = triangles.reshape(-1, 3)
+    if merge_vertices is None:
+        merge_vertices = not mmap
+    if merge_vertices:
+        vertices, inverse = np.unique(points, axis=0, return_inverse=True)
+        faces = inverse.reshape(-1, 3)
+    else:
+        vertices = points
+        faces = np.arange(len(points)).reshape(-1, 3)
+    return StlMesh(vertices, faces, normals)
+
+
+def shape_triangulation(a_shape, deflection=0.01):
+    r"""Vertex and face arrays of the triangulation of a shape
+
+    The faces that are not triangulated yet are meshed with BRepMesh_IncrementalMesh, the existing
+    Poly_Triangulation of the other faces is reused as is.
+
+    Parameters
+    ----------
+    a_shape : TopoDS_Shape or subclass
+    deflection : float (optional)
+        Linear deflection used to mesh the faces that are not triangulated yet (default is 0.01)
+
+    Returns
+    -------
+    tuple(numpy.ndarray, numpy.ndarray)
+        (N, 3) float vertex coordinates and (F, 3) int indices into the vertices
+
+    """
+    import numpy as np
+
+    check_shape(a_shape)  # raises an exception if the shape is not valid
+    BRepMesh.BRepMesh_IncrementalMesh(a_shape, deflection)
+
+    vertices = list()
+    faces = list()
+    offset = 0
+    explorer = TopExp.TopExp_Explorer(a_shape, TopAbs.TopAbs_FACE)
+    while explorer.More():
+        face = TopoDS.topods_Face(explorer.Current())
+        explorer.Next()
+        location = TopLoc.TopLoc_Location()
+        h_triangulation = BRep.BRep_Tool_Triangulation(face, location)
+        if h_triangulation.IsNull():
+            logger.warning("A face could not be triangulated")
+            continue
+        triangulation = h_triangulation.GetObject()
+        transformation = location.Transformation()
+        nodes = triangulation.Nodes()
+        for i in range(nodes.Lower(), nodes.Upper() + 1):
+            pnt = nodes.Value(i).Transformed(transformation)
+            vertices.append((pnt.X(), pnt.Y(), pnt.Z()))
+        triangles = triangulation.Triangles()
+        face_triangles = np.array([triangles.Value(i).Get() for i in range(triangles.Lower(), triangles.Upper() + 1)],
+                                  dtype=np.int64).reshape(-1, 3) - nodes.Lower() + offset
+        if face.Orientation() == TopAbs.TopAbs_REVERSED:
+            face_triangles = face_triangles[:, ::-1]
+        faces.append(face_triangles)
+        offset += nodes.Length()
+
+    if not faces:
+        msg = "The shape has no triangulation"
+        logger.error(msg)
+        raise ValueError(msg)
+    return np.array(vertices, dtype=np.float64), np.concatenate(faces)
+
+
+def write_stl_binary(filename, vertices, faces, normals=None, header=b"OCCDataExchange binary STL"):
+    r"""Write a triangle mesh to a binary STL file in a single write
+
+    Parameters
+    ----------
+    filename : str
+    vertices : numpy.ndarray
+        (N, 3) float array of vertex coordinates
+    faces : numpy.ndarray
+        (F, 3) int array of indices into vertices
+    normals : numpy.ndarray (optional)
+        (F, 3) float array of facet normals. Computed from the vertices if None (default).
+    header : bytes (optional)
+        Header of the file, truncated / padded to 80 bytes
+
+    """
+    import numpy as np
+
+    triangles = np.asarray(vertices, dtype=np.float32)[np.asarray(faces)]
+    if normals is None:
+        normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        non_degenerated = lengths > 0
+        normals[non_degenerated] /= lengths[non_degenerated, np.newaxis]
+
+    data = np.zeros(len(triangles), dtype=np.dtype(_stl_binary_fields))
+    data["normal"] = normals
+    data["vertices"] = triangles
+
+    with open(filename, "wb") as f:
+        f.write(header[:80].ljust(80, b" ") + np.array([len(data)], dtype="<u4").tobytes() + data.tobytes())
+    logger.info("Wrote %i triangles to binary STL file" % len(data))
+
 
 class StlImporter(object):
     r"""STL importer
@@ -22,34 +272,84 @@ class StlImporter(object):
     Parameters
     ----------
     filename : str
+    lazy : bool (optional)
+        If True, only the filename is checked at instantiation and the file is read
+        on first access to the results. The default is False (read at instantiation).
+    mesh : bool (optional)
+        If True, the file is read into numpy arrays (see read_stl_mesh()) and the shape
+        is only built on first access to shape. The default is False (StlAPI_Reader).
+    mmap : bool (optional)
+        Memory map binary files in mesh mode (default is False)
 
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, lazy=False, mesh=False, mmap=False):
         logger.info("StlImporter instantiated with filename : %s" % filename)
 
         check_importer_filename(filename, stl_extensions)
         self._filename = filename
         self._shape = None
+        self._mesh = None
+        self._mesh_mode = mesh
+        self._mmap = mmap
+        self.stats = ConversionStats(self.__class__.__name__, filename)
+        self._is_read = False
+
+        if not lazy:
+            self._ensure_read()
 
-        logger.info("Reading file ....")
-        self.read_file()
+    def _ensure_read(self):
+        r"""Read the file if it has not been read yet"""
+        if not self._is_read:
+            logger.info("Reading file ....")
+            self.read_file()
 
     def read_file(self):
-        r"""Read the STL file and stores the result in a TopoDS_Shape"""
+        r"""Read the STL file and stores the result in a TopoDS_Shape (or a StlMesh in mesh mode)"""
+        self.stats.count("bytes_read", os.path.getsize(self._filename))
+        if self._mesh_mode:
+            with self.stats.phase("read"):
+                self._mesh = read_stl_mesh(self._filename, mmap=self._mmap)
+            self.stats.count("triangles", self._mesh.nb_triangles)
+            self.stats.report()
+            self._is_read = True
+            return
         stl_reader = StlAPI.StlAPI_Reader()
         shape = TopoDS.TopoDS_Shape()
-        stl_reader.Read(shape, self._filename)
+        with self.stats.phase("read"):
+            stl_reader.Read(shape, self._filename)
         self._shape = shape
+        self.stats.count("shapes", 0 if shape.IsNull() else 1)
+        self.stats.report()
+        self._is_read = True
 
     @property
     def shape(self):
         r"""Shape"""
+        self._ensure_read()
+        if self._shape is None:
+            logger.info("Building shape from %i triangles" % self._mesh.nb_triangles)
+            with self.stats.phase("transfer"):
+                self._shape = self._mesh.to_shape()
         if self._shape.IsNull():
             raise AssertionError("Error: the shape is NULL")
         else:
             return self._shape
 
+    @property
+    def mesh(self):
+        r"""Mesh (only available in mesh mode)
+
+        Returns
+        -------
+        StlMesh
+
+        """
+        self._ensure_read()
+        if self._mesh is None:
+            raise AssertionError("Error: the mesh is only available in mesh mode")
+        return self._mesh
+
 
 class StlExporter(object):
     """ A TopoDS_Shape to STL exporter. Default mode is ASCII
@@ -59,18 +359,41 @@ class StlExporter(object):
     filename : str
     ascii_mode : bool
         (default is False)
+    from_triangulation : bool
+        If True, the binary file is written from the triangulation of the shape
+        (see shape_triangulation()) instead of using StlAPI_Writer (default is False)
+    deflection : float
+        Linear deflection used to mesh the faces that are not triangulated yet,
+        when from_triangulation is True (default is 0.01)
+    tessellation_cache : OCCDataExchange.cache.TessellationCache
+        If provided, the triangulations are looked up in / stored to the cache.
+        Implies from_triangulation=True.
     """
 
-    def __init__(self, filename=None, ascii_mode=False):
+    def __init__(self, filename=None, ascii_mode=False, from_triangulation=False, deflection=0.01,
+                 tessellation_cache=None):
         logger.info("StlExporter instantiated with filename : %s" % filename)
         logger.info("StlExporter ascii : %s" % str(ascii_mode))
 
+        if tessellation_cache is not None:
+            from_triangulation = True
+
+        if ascii_mode and from_triangulation:
+            msg = "Writing from the triangulation is only available in binary mode"
+            logger.error(msg)
+            raise ValueError(msg)
+
         check_exporter_filename(filename, stl_extensions)
         check_overwrite(filename)
 
         self._shape = None  # only one shape can be exported
+        self._mesh = None
         self._ascii_mode = ascii_mode
+        self._from_triangulation = from_triangulation
+        self._deflection = deflection
+        self._tessellation_cache = tessellation_cache
         self._filename = filename
+        self.stats = ConversionStats(self.__class__.__name__, filename)
 
     def set_shape(self, a_shape):
         """
@@ -83,9 +406,49 @@ class StlExporter(object):
         """
         check_shape(a_shape)  # raises an exception if the shape is not valid
         self._shape = a_shape
+        self._mesh = None
+
+    def set_mesh(self, vertices, faces, normals=None):
+        r"""Set a triangle mesh to export instead of a shape, it is written as a binary STL file
+
+        Parameters
+        ----------
+        vertices : numpy.ndarray
+            (N, 3) float array of vertex coordinates
+        faces : numpy.ndarray
+            (F, 3) int array of indices into vertices
+        normals : numpy.ndarray (optional)
+            (F, 3) float array of facet normals
+
+        """
+        import numpy as np
+
+        if self._ascii_mode:
+            msg = "A mesh can only be exported in binary mode"
+            logger.error(msg)
+            raise ValueError(msg)
+        self._mesh = StlMesh(np.asarray(vertices), np.asarray(faces), normals)
+        self._shape = None
 
     def write_file(self):
         r"""Write file"""
-        stl_writer = StlAPI.StlAPI_Writer()
-        stl_writer.Write(self._shape, self._filename, self._ascii_mode)
-        logger.info("Wrote STL file")
+        if self._mesh is not None:
+            with self.stats.phase("write"):
+                write_stl_binary(self._filename, self._mesh.vertices, self._mesh.faces, self._mesh.normals)
+        elif self._from_triangulation:
+            with self.stats.phase("transfer"):
+                if self._tessellation_cache is not None:
+                    vertices, faces = self._tessellation_cache.triangulation(self._shape, self._deflection)
+                else:
+                    vertices, faces = shape_triangulation(self._shape, self._deflection)
+            with self.stats.phase("write"):
+                write_stl_binary(self._filename, vertices, faces)
+            self.stats.count("shapes")
+        else:
+            stl_writer = StlAPI.StlAPI_Writer()
+            with self.stats.phase("write"):
+                stl_writer.Write(self._shape, self._filename, self._ascii_mode)
+            self.stats.count("shapes")
+            logger.info("Wrote STL file")
+        self.stats.count("bytes_written", os.path.getsize(self._filename))
+        self.stats.report()
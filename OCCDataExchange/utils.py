@@ -5,11 +5,30 @@ r"""utils module of OCCDataExchange"""
 
 from __future__ import print_function
 
+import collections
 import logging
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
+ImportResult = collections.namedtuple("ImportResult", ["path", "shapes", "elapsed", "error"])
+ImportResult.__doc__ = r"""Result of the import of a single file by files_to_shapes()
+
+path : the imported file
+shapes : list of TopoDS_Shape (None if the import failed)
+elapsed : time spent importing the file, in seconds
+error : error message (None if the import succeeded)
+"""
+
+RootInfo = collections.namedtuple("RootInfo", ["index", "entity_type", "name"])
+RootInfo.__doc__ = r"""Description of a root for transfer of a STEP or IGES file
+
+index : index of the root (starting at 1)
+entity_type : type of the root entity (e.g. StepBasic_ProductDefinition)
+name : product name (STEP) or entity label (IGES), None if not available
+"""
+
 
 def path_from_file(file_origin, relative_path):
     r"""Builds an absolute path from a file using a relative path
@@ -51,49 +70,215 @@ def extract_file_extension(filename):
         return (filename.split("/")[-1]).split(".")[-1]
 
 
-def shape_to_file(shape, pth, filename, format='iges'):
-    """write a Shape to a .iges .brep .stl or .step file"""
+def select_roots(root_infos, roots):
+    r"""Indices of the roots to transfer
+
+    Parameters
+    ----------
+    root_infos : list[RootInfo]
+        All the roots of the file
+    roots : iterable of int or callable
+        Either the indices of the roots to transfer or a predicate called with each RootInfo
+
+    Returns
+    -------
+    list[int]
+
+    """
+    if callable(roots):
+        return [info.index for info in root_infos if roots(info)]
+    indices = sorted(set(roots))
+    for index in indices:
+        if not 1 <= index <= len(root_infos):
+            msg = "Root index %i out of range [1, %i]" % (index, len(root_infos))
+            logger.error(msg)
+            raise ValueError(msg)
+    return indices
+
+
+def same_shapes(shapes_1, shapes_2):
+    r"""Are 2 lists made of the same shape objects, in the same order ?
+
+    Parameters
+    ----------
+    shapes_1 : list[TopoDS.TopoDS_Shape]
+    shapes_2 : list[TopoDS.TopoDS_Shape]
+
+    Returns
+    -------
+    bool
+
+    """
+    return len(shapes_1) == len(shapes_2) and all(s1 is s2 for s1, s2 in zip(shapes_1, shapes_2))
+
+
+class ShapeInstances(object):
+    r"""Shapes grouped by partners (same TShape, possibly different locations)
+
+    Used by the exporters to detect shapes added several times.
+
+    """
+
+    # HashCode() upper bound
+    _hash_upper = 2147483647
+
+    def __init__(self):
+        self._groups = dict()  # hash of the TShape -> list of groups of partner shapes
+        self._ordered_groups = list()  # groups in the order of their first shape
+
+    def add(self, a_shape):
+        r"""Add a shape
+
+        Parameters
+        ----------
+        a_shape : TopoDS_Shape or subclass
+
+        Returns
+        -------
+        bool
+            False if an equal shape (same TShape, location and orientation) was already added,
+            it is then ignored
+
+        """
+        from OCC import TopLoc
+
+        # the hash of the shape without its location only depends on its TShape
+        key = a_shape.Located(TopLoc.TopLoc_Location()).HashCode(self._hash_upper)
+        for group in self._groups.get(key, list()):
+            if group[0].IsPartner(a_shape):
+                # IsSame() ignores the orientation, a reversed copy is not a duplicate
+                if any(shape.IsEqual(a_shape) for shape in group):
+                    return False
+                group.append(a_shape)
+                return True
+        group = [a_shape]
+        self._groups.setdefault(key, list()).append(group)
+        self._ordered_groups.append(group)
+        return True
 
+    @property
+    def groups(self):
+        r"""Groups of partner shapes, in the order of their first shape
+
+        Returns
+        -------
+        list[list[TopoDS_Shape]]
+
+        """
+        return self._ordered_groups
+
+
+def _write_shape(shape, _file, format, tessellation_cache=None):
+    r"""Write a shape to _file with the exporter of format"""
     from OCCDataExchange.brep import BrepExporter
     from OCCDataExchange.iges import IgesExporter
     from OCCDataExchange.step import StepExporter
     from OCCDataExchange.stl import StlExporter
 
-    _pth = os.path.join(pth, filename)
-    assert not os.path.isdir(_pth), 'wrong path, filename'
-    _file = str("%s.%s" % (_pth, format))
-
-    _formats = ['iges', 'igs', 'step', 'stp', 'brep', 'stl']
-    assert format in _formats, '%s is not a readable format, should be one of %s ' % (format, _formats)
-
     if format in ['iges', 'igs']:
         writer = IgesExporter(_file)
         writer.add_shape(shape)
         writer.write_file()
-        return _file
 
     elif format in ['step', 'stp']:
         writer = StepExporter(_file)
         writer.add_shape(shape)
         writer.write_file()
-        return _file
 
     elif format == 'brep':
         writer = BrepExporter(_file)
         writer.set_shape(shape)
         writer.write_file()
-        return _file
 
     elif format == 'stl':
-        writer = StlExporter(_file)
+        writer = StlExporter(_file, tessellation_cache=tessellation_cache)
         writer.set_shape(shape)
         writer.write_file()
-        return _file
 
     else:
         raise ValueError('format should be one of [iges,igs], [step,stp], brep, stl\ngot %s' % (format))
 
 
+def _write_shape_worker(data, _file, format):
+    r"""Process pool worker of shape_to_file(), the shape is serialized by brep.shape_to_bytes()"""
+    from OCCDataExchange.brep import shape_from_bytes
+
+    _write_shape(shape_from_bytes(data), _file, format)
+    return _file
+
+
+def shape_to_file(shape, pth, filename, format='iges', formats=None, workers=None, tessellation_cache=None):
+    """write a Shape to a .iges .brep .stl or .step file
+
+    The file written is returned.
+
+    Several files can be written at once with formats (e.g. formats=['step', 'stl', 'brep']), the shape
+    is then checked once. With workers > 1, the STEP / IGES / BREP translations run concurrently in
+    worker processes (which only pays off for large shapes) while the STL file is written by the calling
+    process. An OrderedDict format -> file, in the order of formats, is then returned.
+
+    If tessellation_cache (a cache.TessellationCache) is provided, the STL file is written from its
+    triangulation of the shape, otherwise by StlAPI_Writer.
+    """
+    _pth = os.path.join(pth, filename)
+    assert not os.path.isdir(_pth), 'wrong path, filename'
+
+    _formats = ['iges', 'igs', 'step', 'stp', 'brep', 'stl']
+    if formats is None:
+        assert format in _formats, '%s is not a readable format, should be one of %s ' % (format, _formats)
+        _file = str("%s.%s" % (_pth, format))
+        _write_shape(shape, _file, format, tessellation_cache)
+        return _file
+
+    for _format in formats:
+        assert _format in _formats, '%s is not a readable format, should be one of %s ' % (_format, _formats)
+    _files = [str("%s.%s" % (_pth, _format)) for _format in formats]
+    _shape_to_files(shape, list(zip(_files, formats)), workers, tessellation_cache)
+    return collections.OrderedDict(zip(formats, _files))
+
+
+def _shape_to_files(shape, targets, workers=None, tessellation_cache=None):
+    r"""Write a shape to several files, see shape_to_file()
+
+    Parameters
+    ----------
+    shape : TopoDS_Shape or subclass
+    targets : list[tuple(str, str)]
+        (file, format)
+    workers : int (optional)
+        Number of worker processes for the STEP / IGES / BREP translations. The default (None)
+        writes the files one after the other in the calling process.
+    tessellation_cache : OCCDataExchange.cache.TessellationCache (optional)
+
+    """
+    from OCCDataExchange.checks import check_shape
+
+    check_shape(shape)  # once for all the targets
+    translated = [(_file, _format) for _file, _format in targets if _format != 'stl']
+
+    def _write_stl():
+        for _file, _format in targets:
+            if _format == 'stl':
+                _write_shape(shape, _file, _format, tessellation_cache)
+
+    if workers is None or workers <= 1 or len(translated) < 2:
+        for _file, _format in translated:
+            _write_shape(shape, _file, _format)
+        _write_stl()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    from OCCDataExchange.brep import shape_to_bytes
+
+    data = shape_to_bytes(shape)
+    with ProcessPoolExecutor(max_workers=min(workers, len(translated))) as executor:
+        futures = [executor.submit(_write_shape_worker, data, _file, _format) for _file, _format in translated]
+        # the STL file is written by the calling process in the meantime
+        _write_stl()
+        for future in futures:
+            logger.info("Wrote %s" % future.result())  # raises the exception of a failed translation
+
+
 def file_to_shape(pth):
     '''get a Shape from an .iges or .step file'''
 
@@ -116,8 +301,153 @@ def file_to_shape(pth):
 
     elif ext == '.brep':
         reader = BrepImporter(pth)
-        return reader.compound
+        return reader.shape
 
     elif ext == '.stl':
         reader = StlImporter(pth)
         return reader.shape
+
+
+def _read_shapes(pth):
+    r"""Read the shapes of a file using the importer matching its extension
+
+    Parameters
+    ----------
+    pth : str
+        Path to the file
+
+    Returns
+    -------
+    list[TopoDS.TopoDS_Shape]
+
+    """
+    from OCCDataExchange.brep import BrepImporter
+    from OCCDataExchange.iges import IgesImporter
+    from OCCDataExchange.step import StepImporter
+    from OCCDataExchange.stl import StlImporter
+
+    ext = os.path.splitext(pth)[1].lower()
+
+    if ext in ['.iges', '.igs']:
+        return IgesImporter(pth).shapes
+    elif ext in ['.step', '.stp']:
+        return StepImporter(pth).shapes
+    elif ext == '.brep':
+        return [BrepImporter(pth).shape]
+    elif ext == '.stl':
+        return [StlImporter(pth).shape]
+    else:
+        raise ValueError('%s is not a readable format' % ext)
+
+
+def _write_shapes(shapes, pth):
+    r"""Write shapes to a file using the exporter matching its extension
+
+    STEP and IGES files get one root per shape, BREP and STL files get a compound of the shapes.
+
+    Parameters
+    ----------
+    shapes : list[TopoDS.TopoDS_Shape]
+    pth : str
+        Path to the file
+
+    """
+    from OCCDataExchange.brep import BrepExporter
+    from OCCDataExchange.iges import IgesExporter
+    from OCCDataExchange.step import StepExporter
+    from OCCDataExchange.stl import StlExporter
+
+    ext = os.path.splitext(pth)[1].lower()
+
+    if ext in ['.iges', '.igs', '.step', '.stp']:
+        writer = IgesExporter(pth) if ext in ['.iges', '.igs'] else StepExporter(pth)
+        for shape in shapes:
+            writer.add_shape(shape)
+    elif ext in ['.brep', '.stl']:
+        from OCC import BRep
+        from OCC import TopoDS
+
+        compound = TopoDS.TopoDS_Compound()
+        brep_builder = BRep.BRep_Builder()
+        brep_builder.MakeCompound(compound)
+        for shape in shapes:
+            brep_builder.Add(compound, shape)
+        writer = BrepExporter(pth) if ext == '.brep' else StlExporter(pth)
+        writer.set_shape(compound)
+    else:
+        raise ValueError('%s is not a writable format' % ext)
+    writer.write_file()
+
+
+def _import_worker(pth):
+    r"""Process pool worker for files_to_shapes()
+
+    Shapes cannot be pickled, they are sent back to the calling process serialized by brep.shape_to_bytes()
+    """
+    from OCCDataExchange.brep import shape_to_bytes
+
+    start = time.time()
+    try:
+        data = [shape_to_bytes(shape) for shape in _read_shapes(pth)]
+        return pth, data, time.time() - start, None
+    except Exception as e:
+        return pth, None, time.time() - start, "%s: %s" % (e.__class__.__name__, e)
+
+
+def files_to_shapes(paths, workers=None):
+    r"""Import many files in parallel using a process pool
+
+    Results are yielded as soon as each file is imported, so not necessarily in the order of paths.
+    A file that cannot be imported does not stop the batch, its error is reported in the result.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Paths to .iges, .igs, .stp, .step, .brep or .stl files
+    workers : int (optional)
+        Number of worker processes. The default (None) uses the number of CPUs.
+        With workers=1, the files are imported one after the other in the calling process.
+
+    Yields
+    ------
+    ImportResult
+
+    """
+    from OCCDataExchange.brep import shape_from_bytes
+
+    paths = list(paths)
+    logger.info("Importing %i file(s)" % len(paths))
+
+    if workers == 1:
+        for pth in paths:
+            start = time.time()
+            try:
+                shapes = _read_shapes(pth)
+                yield ImportResult(pth, shapes, time.time() - start, None)
+            except Exception as e:
+                yield ImportResult(pth, None, time.time() - start, "%s: %s" % (e.__class__.__name__, e))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict((executor.submit(_import_worker, pth), pth) for pth in paths)
+        for future in as_completed(futures):
+            # a crashed worker (BrokenProcessPool) or a shape that cannot be rebuilt only fails its file
+            try:
+                pth, data, elapsed, error = future.result()
+            except Exception as e:
+                pth, data, elapsed = futures[future], None, time.time() - start
+                error = "%s: %s" % (e.__class__.__name__, e)
+            shapes = None
+            if error is None:
+                try:
+                    shapes = [shape_from_bytes(d) for d in data]
+                except Exception as e:
+                    error = "%s: %s" % (e.__class__.__name__, e)
+            if error is None:
+                logger.info("Imported %s in %.3f s" % (pth, elapsed))
+            else:
+                logger.warning("Could not import %s : %s" % (pth, error))
+            yield ImportResult(pth, shapes, elapsed, error)
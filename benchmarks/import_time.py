@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""Import time benchmark of OCCDataExchange
+
+Times the import of the package and of each of its modules in a fresh interpreter, and checks that
+none of them loads OCC, OCCUtils or numpy (they should only be loaded when a file is actually read or written).
+
+Usage
+-----
+
+python benchmarks/import_time.py
+python benchmarks/import_time.py --repeat 10 --max-time 0.5 -o import_times.json
+
+The exit status is 1 if a module loads OCC, OCCUtils or numpy or takes more than --max-time seconds to import.
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.abspath(os.path.join(here, ".."))
+
+# top level packages that importing OCCDataExchange should not load
+HEAVY_PACKAGES = ["OCC", "OCCUtils", "numpy"]
+
+MODULES = ["OCCDataExchange",
+           "OCCDataExchange.aio",
+           "OCCDataExchange.brep",
+           "OCCDataExchange.cache",
+           "OCCDataExchange.checks",
+           "OCCDataExchange.cli",
+           "OCCDataExchange.dat",
+           "OCCDataExchange.iges",
+           "OCCDataExchange.lazy",
+           "OCCDataExchange.scan",
+           "OCCDataExchange.sessions",
+           "OCCDataExchange.stats",
+           "OCCDataExchange.step",
+           "OCCDataExchange.step_ocaf",
+           "OCCDataExchange.stl",
+           "OCCDataExchange.utils"]
+
+# run in the fresh interpreter : prints the import time and the heavy modules loaded by the import
+_SCRIPT = r"""
+import json, sys, time
+start = time.time()
+import %s
+elapsed = time.time() - start
+heavy = sorted(m for m in sys.modules if m.split(".")[0] in %r)
+print(json.dumps({"time": elapsed, "heavy_modules": heavy}))
+"""
+
+
+def time_import(module, repeat=5):
+    r"""Best import time of a module over repeat fresh interpreters
+
+    Parameters
+    ----------
+    module : str
+    repeat : int (optional)
+
+    Returns
+    -------
+    dict
+        module, time (seconds), heavy_modules (modules of HEAVY_PACKAGES loaded by the import)
+
+    """
+    env = dict(os.environ)
+    # benchmark the working tree rather than an installed version
+    env["PYTHONPATH"] = os.pathsep.join([root] + [p for p in [env.get("PYTHONPATH")] if p])
+    script = _SCRIPT % (module, tuple(HEAVY_PACKAGES))
+    runs = list()
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", script], env=env, cwd=root)
+        runs.append(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["time"])
+    return {"module": module, "time": best["time"], "heavy_modules": best["heavy_modules"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCCDataExchange import time benchmark")
+    parser.add_argument("-o", "--output", help="JSON file to write the results to")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs per module, the best one is kept")
+    parser.add_argument("--max-time", type=float, default=None,
+                        help="fail if a module takes more than this number of seconds to import")
+    args = parser.parse_args(argv)
+
+    results = list()
+    status = 0
+    for module in MODULES:
+        result = time_import(module, args.repeat)
+        results.append(result)
+        problems = list()
+        if result["heavy_modules"]:
+            problems.append("loads %s" % ", ".join(result["heavy_modules"]))
+        if args.max_time is not None and result["time"] > args.max_time:
+            problems.append("slower than %.3f s" % args.max_time)
+        if problems:
+            status = 1
+        print("%-28s %8.4f s %s" % (module, result["time"], "; ".join(problems)))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""Import / export benchmarks of OCCDataExchange
+
+Times the import and export of every format on the files of tests/models_in and on
+synthetic models made of 10, 100, 1000 and 10000 boxes.
+
+Each case runs in a fresh process so that its peak RSS is not polluted by the previous cases.
+
+Usage
+-----
+
+python benchmarks/run_benchmarks.py -o results.json
+python benchmarks/run_benchmarks.py --scales 10 100 --repeat 3 -o results.json
+python benchmarks/run_benchmarks.py --compare before.json after.json
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+here = os.path.dirname(os.path.abspath(__file__))
+models_in = os.path.join(here, "..", "tests", "models_in")
+
+# benchmark the working tree rather than an installed version
+sys.path.insert(0, os.path.join(here, ".."))
+
+# (format, fixture file) imported from tests/models_in
+IMPORT_FIXTURES = [("step_203", "box_203.stp"),
+                   ("step_203", "2_boxes_203.stp"),
+                   ("step_214", "box_214.stp"),
+                   ("step_214", "2_boxes_214.stp"),
+                   ("step_214", "aube_pleine.stp"),
+                   ("step_ocaf", "2_boxes_214.stp"),
+                   ("iges", "box.igs"),
+                   ("iges", "2_boxes.igs"),
+                   ("iges", "aube_pleine.iges"),
+                   ("stl_ascii", "2_boxes_ascii.stl"),
+                   ("stl_binary", "2_boxes_binary.stl"),
+                   ("dat", "naca0006.dat")]
+
+# format -> extension of the exported file
+EXPORT_FORMATS = [("step_203", "stp"),
+                  ("step_214", "stp"),
+                  ("step_ocaf", "stp"),
+                  ("iges_5.1", "igs"),
+                  ("iges_5.3", "igs"),
+                  ("stl_ascii", "stl"),
+                  ("stl_binary", "stl"),
+                  ("brep", "brep")]
+
+DEFAULT_SCALES = [10, 100, 1000, 10000]
+
+
+def _peak_rss():
+    r"""Peak resident set size of the current process, in bytes (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _boxes(nb_parts):
+    r"""nb_parts boxes laid out on a grid"""
+    from OCC import BRepPrimAPI
+    from OCC import gp
+
+    side = int(nb_parts ** 0.5) + 1
+    shapes = list()
+    for i in range(nb_parts):
+        corner = gp.gp_Pnt(20. * (i % side), 20. * (i // side), 0.)
+        shapes.append(BRepPrimAPI.BRepPrimAPI_MakeBox(corner, 10., 10., 10.).Shape())
+    return shapes
+
+
+def _compound(shapes):
+    from OCC import BRep
+    from OCC import TopoDS
+
+    compound = TopoDS.TopoDS_Compound()
+    brep_builder = BRep.BRep_Builder()
+    brep_builder.MakeCompound(compound)
+    for shape in shapes:
+        brep_builder.Add(compound, shape)
+    return compound
+
+
+def _import(fmt, filename):
+    r"""Import filename with the importer of fmt, return the number of shapes"""
+    if fmt.startswith("step_ocaf"):
+        from OCCDataExchange.step_ocaf import StepOcafImporter
+        return len(StepOcafImporter(filename).shapes)
+    elif fmt.startswith("step"):
+        from OCCDataExchange.step import StepImporter
+        return len(StepImporter(filename).shapes)
+    elif fmt.startswith("iges"):
+        from OCCDataExchange.iges import IgesImporter
+        return len(IgesImporter(filename).shapes)
+    elif fmt.startswith("stl"):
+        from OCCDataExchange.stl import StlImporter
+        StlImporter(filename).shape
+        return 1
+    elif fmt == "brep":
+        from OCCDataExchange.brep import BrepImporter
+        BrepImporter(filename).shape
+        return 1
+    elif fmt == "dat":
+        from OCCDataExchange.dat import DatImporter
+        return len(DatImporter(filename).points)
+    raise ValueError("Unknown format %s" % fmt)
+
+
+def _export(fmt, shapes, filename):
+    r"""Export shapes to filename with the exporter of fmt"""
+    if fmt == "step_ocaf":
+        from OCCDataExchange.step_ocaf import StepOcafExporter
+        exporter = StepOcafExporter(filename)
+        for shape in shapes:
+            exporter.add_shape(shape)
+    elif fmt.startswith("step"):
+        from OCCDataExchange.step import StepExporter
+        exporter = StepExporter(filename, schema="AP203" if fmt == "step_203" else "AP214CD")
+        for shape in shapes:
+            exporter.add_shape(shape)
+    elif fmt.startswith("iges"):
+        from OCCDataExchange.iges import IgesExporter
+        exporter = IgesExporter(filename, format=fmt.split("_")[1])
+        for shape in shapes:
+            exporter.add_shape(shape)
+    elif fmt.startswith("stl"):
+        from OCCDataExchange.stl import StlExporter
+        exporter = StlExporter(filename, ascii_mode=(fmt == "stl_ascii"))
+        exporter.set_shape(_compound(shapes))
+    elif fmt == "brep":
+        from OCCDataExchange.brep import BrepExporter
+        exporter = BrepExporter(filename)
+        exporter.set_shape(_compound(shapes))
+    else:
+        raise ValueError("Unknown format %s" % fmt)
+    exporter.write_file()
+
+
+def _run_case(case):
+    r"""Run a benchmark case, in a dedicated worker process
+
+    Parameters
+    ----------
+    case : dict
+        operation ("import" or "export"), format, parts (number of synthetic parts or None),
+        file (fixture to import), work_dir
+
+    Returns
+    -------
+    dict
+        the case updated with wall_time, peak_rss, output_size and error
+
+    """
+    result = dict(case)
+    result.update(wall_time=None, peak_rss=None, output_size=None, error=None)
+    try:
+        ext = dict(EXPORT_FORMATS).get(case["format"], "stp")
+        if case["operation"] == "export":
+            shapes = _boxes(case["parts"])
+            filename = os.path.join(case["work_dir"], "%s_%i.%s" % (case["format"], case["parts"], ext))
+            start = time.time()
+            _export(case["format"], shapes, filename)
+            result["wall_time"] = time.time() - start
+            result["output_size"] = os.path.getsize(filename)
+        else:
+            if case["parts"] is None:
+                filename = os.path.join(models_in, case["file"])
+            else:
+                # import the synthetic file written by the export case
+                filename = os.path.join(case["work_dir"], "%s_%i.%s" % (case["format"], case["parts"], ext))
+            start = time.time()
+            result["shapes"] = _import(case["format"], filename)
+            result["wall_time"] = time.time() - start
+            result["input_size"] = os.path.getsize(filename)
+    except Exception as e:
+        result["error"] = "%s: %s" % (e.__class__.__name__, e)
+    result["peak_rss"] = _peak_rss()
+    return result
+
+
+def _cases(scales, work_dir):
+    r"""Benchmark cases, an export case always comes before the import of the same synthetic file"""
+    cases = list()
+    for fmt, fixture in IMPORT_FIXTURES:
+        cases.append(dict(operation="import", format=fmt, parts=None, file=fixture, work_dir=work_dir))
+    for parts in scales:
+        for fmt, _ in EXPORT_FORMATS:
+            cases.append(dict(operation="export", format=fmt, parts=parts, file=None, work_dir=work_dir))
+            cases.append(dict(operation="import", format=fmt, parts=parts, file=None, work_dir=work_dir))
+    return cases
+
+
+def run(scales=DEFAULT_SCALES, repeat=1):
+    r"""Run all the benchmark cases
+
+    Parameters
+    ----------
+    scales : list[int]
+        Number of parts of the synthetic models
+    repeat : int
+        Number of runs of each case, the best wall time is kept
+
+    Returns
+    -------
+    dict
+        Environment description and list of results
+
+    """
+    import OCCDataExchange
+
+    work_dir = tempfile.mkdtemp(prefix="occdx_bench_")
+    results = list()
+    try:
+        # maxtasksperchild=1 : one fresh process per case
+        pool = multiprocessing.Pool(1, maxtasksperchild=1)
+        try:
+            for case in _cases(scales, work_dir):
+                runs = [pool.apply(_run_case, (case,)) for _ in range(repeat)]
+                best = min(runs, key=lambda r: r["wall_time"] if r["wall_time"] is not None else float("inf"))
+                best.pop("work_dir")
+                results.append(best)
+                print("%-7s %-11s %-18s %10s s %s" % (best["operation"], best["format"],
+                                                      best["file"] or "%i parts" % best["parts"],
+                                                      "%.4f" % best["wall_time"] if best["wall_time"] is not None
+                                                      else "-",
+                                                      best["error"] or ""))
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {"version": OCCDataExchange.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results}
+
+
+def _case_id(result):
+    return result["operation"], result["format"], result["file"], result["parts"]
+
+
+def compare(before, after):
+    r"""Print the wall time ratio of the cases of 2 result files
+
+    Parameters
+    ----------
+    before : dict
+    after : dict
+
+    """
+    before_results = {_case_id(r): r for r in before["results"]}
+    for result in after["results"]:
+        reference = before_results.get(_case_id(result))
+        if reference is None or not reference["wall_time"] or result["wall_time"] is None:
+            continue
+        print("%-7s %-11s %-18s %10.4f s -> %10.4f s  x%.2f" % (result["operation"], result["format"],
+                                                               result["file"] or "%i parts" % result["parts"],
+                                                               reference["wall_time"], result["wall_time"],
+                                                               result["wall_time"] / reference["wall_time"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OCCDataExchange import / export benchmarks")
+    parser.add_argument("-o", "--output", help="JSON file to write the results to")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="number of parts of the synthetic models")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs per case, the best one is kept")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare 2 result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        compare(before, after)
+        return 0
+
+    report = run(args.scales, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
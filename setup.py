@@ -84,6 +84,7 @@ setup(
 
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
+        # The OCCDataExchange.aio module requires Python >= 3.7 (async / await, asyncio.run())
         'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
@@ -135,7 +136,7 @@ setup(
     # "scripts" keyword. Entry points provide cross-platform support and allow
     # pip to create the appropriate form of executable for the target platform.
     # entry_points={'console_scripts': ['sample=sample:main',],},
-    entry_points={}
+    entry_points={'console_scripts': ['occdx=OCCDataExchange.cli:main']}
 
     )
 
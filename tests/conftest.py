@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""pytest configuration of the tests"""
+
+import sys
+
+# the aio module and its tests use the async / await syntax and asyncio.run() (Python >= 3.7)
+collect_ignore = ["test_aio.py"] if sys.version_info < (3, 7) else []
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""aio.py module tests"""
+
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from OCCDataExchange import aio
+from OCCDataExchange.aio import aexport_shapes, aimport_file
+from OCCDataExchange.utils import path_from_file
+
+# not collected at all before Python 3.7, see conftest.py
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="the aio module requires Python >= 3.7")
+
+
+@pytest.fixture
+def executor():
+    r"""Thread pool of the tests, the default configuration is restored afterwards"""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+    yield executor
+    aio.configure()
+    executor.shutdown()
+
+
+def test_aimport_file():
+    r"""Import a STEP file from a coroutine"""
+    shapes = asyncio.run(aimport_file(path_from_file(__file__, "./models_in/box_203.stp")))
+    assert len(shapes) == 1
+
+
+def test_aexport_shapes(tmpdir):
+    r"""Import and export from coroutines"""
+    filename = os.path.join(str(tmpdir), "box.igs")
+
+    async def convert():
+        shapes = await aimport_file(path_from_file(__file__, "./models_in/box_203.stp"))
+        await aexport_shapes(shapes, filename)
+
+    asyncio.run(convert())
+    assert os.path.isfile(filename)
+
+
+def test_concurrency_limit(executor):
+    r"""No more than max_concurrency conversions run at the same time"""
+    aio.configure(executor, max_concurrency=2)
+    lock = threading.Lock()
+    running = [0, 0]  # current, maximum
+
+    def work():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def run_all():
+        await asyncio.gather(*[aio._run(executor, None, None, work) for _ in range(6)])
+
+    asyncio.run(run_all())
+    assert running[1] == 2
+
+
+def test_timeout(executor):
+    r"""A timed out conversion is cancelled, the waiting ones run once its job is done"""
+    aio.configure(executor, max_concurrency=1)
+    cancelled = []
+
+    async def run_all():
+        slow = aio._run(executor, 0.05, lambda future: cancelled.append(future), time.sleep, 0.2)
+        with pytest.raises(asyncio.TimeoutError):
+            await slow
+        await aio._run(executor, 1., None, time.sleep, 0.)
+
+    asyncio.run(run_all())
+    executor.shutdown(wait=True)
+    # the running conversion could not be interrupted, the cancel callback was called once it was done
+    assert len(cancelled) == 1
+
+
+def test_timeout_keeps_slot(executor):
+    r"""The job of a timed out conversion still counts in the concurrency limit until it completes"""
+    aio.configure(executor, max_concurrency=1)
+    lock = threading.Lock()
+    running = [0, 0]  # current, maximum
+
+    def work(duration):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(duration)
+        with lock:
+            running[0] -= 1
+
+    async def run_all():
+        with pytest.raises(asyncio.TimeoutError):
+            await aio._run(executor, 0.02, None, work, 0.2)
+        await asyncio.gather(*[aio._run(executor, None, None, work, 0.01) for _ in range(3)])
+
+    asyncio.run(run_all())
+    assert running[1] == 1
+
+
+def test_default_executor_is_process_pool():
+    r"""pythonocc holds the GIL, the default executor is a process pool"""
+    aio.configure()
+    executor = aio._get_executor(None)
+    try:
+        assert isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+    finally:
+        aio.configure()
+        executor.shutdown()
+
+
+def test_configure_shuts_down_default_executor(executor):
+    r"""The process pool created by default is shut down when replaced, an executor of the caller is not"""
+    aio.configure()
+    default_executor = aio._get_executor(None)
+    aio.configure(executor)
+    with pytest.raises(RuntimeError):
+        default_executor.submit(time.sleep, 0.)
+    aio.configure()
+    assert executor.submit(time.sleep, 0.).result() is None
+
+
+def test_configure_wrong_concurrency():
+    r"""max_concurrency < 1"""
+    with pytest.raises(ValueError):
+        aio.configure(max_concurrency=0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""cache.py module tests"""
+
+import os.path
+
+import pytest
+from OCC import BRepPrimAPI
+from OCC import TopAbs
+
+from OCCDataExchange.cache import ShapeCache, TessellationCache
+from OCCDataExchange.iges import IgesImporter
+from OCCDataExchange.step import StepImporter
+from OCCDataExchange.stl import StlExporter
+from OCCDataExchange.utils import path_from_file
+
+
+@pytest.fixture()
+def cache(tmpdir):
+    r"""Empty cache in a temporary directory"""
+    return ShapeCache(str(tmpdir.join("cache")))
+
+
+def test_cache_key():
+    r"""The key depends on the file content and on the parameters"""
+    filename = path_from_file(__file__, "./models_in/box_203.stp")
+    assert ShapeCache.key(filename, importer="step") == ShapeCache.key(filename, importer="step")
+    assert ShapeCache.key(filename, importer="step") != ShapeCache.key(filename, importer="iges")
+    assert ShapeCache.key(filename) != ShapeCache.key(path_from_file(__file__, "./models_in/box_214.stp"))
+
+
+def test_cache_key_read_parameters():
+    r"""The key of a translated file depends on the Interface_Static read parameters"""
+    from OCC import Interface
+
+    filename = path_from_file(__file__, "./models_in/box_203.stp")
+    key = ShapeCache.key(filename, importer="step")
+    previous = Interface.Interface_Static_CVal("read.precision.val")
+    Interface.Interface_Static_SetCVal("read.precision.val", "0.1")
+    try:
+        assert ShapeCache.key(filename, importer="step") != key
+    finally:
+        Interface.Interface_Static_SetCVal("read.precision.val", previous)
+    assert ShapeCache.key(filename, importer="step") == key
+
+
+@pytest.mark.parametrize("content", [b"", b"\x00\x01", b"\x00" * 8 + b"\x00\x00\x00\x01" + b"\x00\x00\x01\x00abc"])
+def test_cache_corrupt_entry(cache, content):
+    r"""A truncated or corrupt entry is a miss, it is removed"""
+    with open(cache._path("corrupt"), "wb") as f:
+        f.write(content)
+    assert cache.get("corrupt") is None
+    assert cache.stats["misses"] == 1
+    assert not os.path.isfile(cache._path("corrupt"))
+
+
+def test_cache_put_existing_entry(cache):
+    r"""An existing entry is replaced"""
+    box = BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+    cache.put("box", [box])
+    cache.put("box", [box, box])
+    assert len(cache.get("box")) == 2
+
+
+def test_step_importer_cache(cache):
+    r"""The second import of a STEP file is served from the cache"""
+    filename = path_from_file(__file__, "./models_in/box_203.stp")
+    first = StepImporter(filename, cache=cache)
+    assert cache.stats["misses"] == 1
+    assert cache.stats["entries"] == 1
+
+    second = StepImporter(filename, cache=cache)
+    assert cache.stats["hits"] == 1
+    assert cache.stats["bytes_saved"] == os.path.getsize(filename)
+    assert len(second.shapes) == len(first.shapes) == 1
+    assert second.shapes[0].ShapeType() == TopAbs.TopAbs_SOLID
+
+
+def test_iges_importer_cache(cache):
+    r"""The second import of an IGES file is served from the cache"""
+    filename = path_from_file(__file__, "./models_in/box.igs")
+    first = IgesImporter(filename, cache=cache)
+    second = IgesImporter(filename, cache=cache)
+    assert cache.stats["hits"] == 1
+    assert len(second.shapes) == len(first.shapes)
+
+
+def test_cache_eviction(tmpdir):
+    r"""The least recently used entries are evicted when the cache is full"""
+    cache = ShapeCache(str(tmpdir.join("cache")), max_size=1)
+    StepImporter(path_from_file(__file__, "./models_in/box_203.stp"), cache=cache)
+    assert cache.stats["entries"] == 0
+
+
+def test_tessellation_cache(tmpdir):
+    r"""STL exports of the same shape share the triangulation"""
+    box_shape = BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+    tessellation_cache = TessellationCache()
+    for i in range(3):
+        exporter = StlExporter(str(tmpdir.join("box_%i.stl" % i)), tessellation_cache=tessellation_cache)
+        exporter.set_shape(box_shape)
+        exporter.write_file()
+    stats = tessellation_cache.stats
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    assert stats["entries"] == 1
+
+    # another deflection is another entry
+    tessellation_cache.triangulation(box_shape, 0.5)
+    assert tessellation_cache.stats["entries"] == 2
+
+
+def test_tessellation_cache_eviction():
+    r"""The least recently used triangulations are evicted when the cache is full"""
+    tessellation_cache = TessellationCache(max_size=1)
+    tessellation_cache.triangulation(BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape(), 0.01)
+    assert tessellation_cache.stats["entries"] == 0
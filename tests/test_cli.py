@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""cli.py module tests"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from OCCDataExchange import cli
+from OCCDataExchange.cli import MANIFEST, convert, find_sources, format_summary, is_up_to_date, main
+from OCCDataExchange.utils import path_from_file
+
+
+def _tree(tmpdir):
+    r"""in_dir with a STEP file, an IGES file in a sub-directory and a non CAD file"""
+    in_dir = os.path.join(str(tmpdir), "in")
+    os.makedirs(os.path.join(in_dir, "sub"))
+    shutil.copy(path_from_file(__file__, "./models_in/box_203.stp"), in_dir)
+    shutil.copy(path_from_file(__file__, "./models_in/box.igs"), os.path.join(in_dir, "sub"))
+    shutil.copy(path_from_file(__file__, "./models_in/naca0006.dat"), in_dir)
+    return in_dir, os.path.join(str(tmpdir), "out")
+
+
+def test_find_sources(tmpdir):
+    r"""The output tree mirrors the input tree"""
+    in_dir, out_dir = _tree(tmpdir)
+    sources = find_sources(in_dir, out_dir, "brep")
+    assert sources == [(os.path.join(in_dir, "box_203.stp"), os.path.join(out_dir, "box_203.brep")),
+                       (os.path.join(in_dir, "sub", "box.igs"), os.path.join(out_dir, "sub", "box.brep"))]
+
+
+def test_is_up_to_date_mtime(tmpdir):
+    r"""An output older than its input is not up to date"""
+    in_dir, out_dir = _tree(tmpdir)
+    source = os.path.join(in_dir, "box_203.stp")
+    output = os.path.join(str(tmpdir), "box_203.brep")
+    assert not is_up_to_date(source, output)
+    with open(output, "w") as f:
+        f.write("")
+    os.utime(output, (os.path.getmtime(source) + 10, os.path.getmtime(source) + 10))
+    assert is_up_to_date(source, output)
+    os.utime(output, (os.path.getmtime(source) - 10, os.path.getmtime(source) - 10))
+    assert not is_up_to_date(source, output)
+
+
+def test_convert_wrong_format(tmpdir):
+    r"""Unknown output format"""
+    in_dir, out_dir = _tree(tmpdir)
+    with pytest.raises(ValueError):
+        convert(in_dir, out_dir, "obj")
+
+
+def test_convert(tmpdir):
+    r"""Convert a tree, then skip the up to date outputs"""
+    in_dir, out_dir = _tree(tmpdir)
+    summary = convert(in_dir, out_dir, "brep", workers=1, check="hash")
+    assert summary["converted"] == 2
+    assert summary["skipped"] == 0
+    assert summary["failed"] == []
+    assert os.path.isfile(os.path.join(out_dir, "sub", "box.brep"))
+
+    summary = convert(in_dir, out_dir, "brep", workers=1, check="hash")
+    assert summary["converted"] == 0
+    assert summary["skipped"] == 2
+    assert "0 converted, 2 skipped, 0 failed" in format_summary(summary)
+
+
+def test_convert_brep(tmpdir):
+    r"""Convert a tree of BREP files"""
+    in_dir, brep_dir = _tree(tmpdir)
+    summary = convert(in_dir, brep_dir, "brep", workers=1)
+    assert summary["converted"] == 2
+
+    out_dir = os.path.join(str(tmpdir), "out_step")
+    summary = convert(brep_dir, out_dir, "step", workers=1)
+    assert summary["converted"] == 2
+    assert summary["failed"] == []
+    assert os.path.isfile(os.path.join(out_dir, "box_203.step"))
+    assert os.path.isfile(os.path.join(out_dir, "sub", "box.step"))
+
+
+def _partial_convert_worker(source, output, to_format):
+    r"""Worker writing an empty output for the STEP files and raising for the other ones"""
+    if not source.endswith(".stp"):
+        raise RuntimeError("worker failure")
+    with open(output, "w") as f:
+        f.write("")
+    return source, output, 0., None
+
+
+def _crashing_convert_worker(source, output, to_format):
+    r"""Worker killing its own process"""
+    os._exit(1)
+
+
+def test_convert_worker_exception(tmpdir, monkeypatch):
+    r"""An exception raised by a worker fails its file, the manifest records the converted files"""
+    monkeypatch.setattr(cli, "_convert_worker", _partial_convert_worker)
+    in_dir, out_dir = _tree(tmpdir)
+    os.makedirs(out_dir)
+    summary = convert(in_dir, out_dir, "brep", workers=2, check="hash")
+    assert summary["converted"] == 1
+    assert [source for source, _ in summary["failed"]] == [os.path.join(in_dir, "sub", "box.igs")]
+    assert "RuntimeError" in summary["failed"][0][1]
+    with open(os.path.join(out_dir, MANIFEST)) as f:
+        assert list(json.load(f).keys()) == ["box_203.brep"]
+
+
+def test_convert_crashed_worker(tmpdir, monkeypatch):
+    r"""A crashed worker process fails the files, the batch is not aborted"""
+    monkeypatch.setattr(cli, "_convert_worker", _crashing_convert_worker)
+    in_dir, out_dir = _tree(tmpdir)
+    summary = convert(in_dir, out_dir, "brep", workers=2)
+    assert summary["converted"] == 0
+    assert sorted(source for source, _ in summary["failed"]) == [os.path.join(in_dir, "box_203.stp"),
+                                                                 os.path.join(in_dir, "sub", "box.igs")]
+    for _, error in summary["failed"]:
+        assert "BrokenProcessPool" in error
+
+
+def test_convert_output_collision(tmpdir, monkeypatch):
+    r"""Inputs having the same output are reported as failed and not converted"""
+    monkeypatch.setattr(cli, "_convert_worker", _partial_convert_worker)
+    in_dir, out_dir = _tree(tmpdir)
+    shutil.copy(path_from_file(__file__, "./models_in/box.igs"), os.path.join(in_dir, "box_203.igs"))
+    summary = convert(in_dir, out_dir, "brep", workers=2)
+    assert summary["converted"] == 0
+    assert sorted(source for source, _ in summary["failed"]) == [os.path.join(in_dir, "box_203.igs"),
+                                                                 os.path.join(in_dir, "box_203.stp"),
+                                                                 os.path.join(in_dir, "sub", "box.igs")]
+    assert not os.path.isfile(os.path.join(out_dir, "box_203.brep"))
+
+
+def test_main_failure(tmpdir):
+    r"""The exit status is 1 if a file cannot be converted"""
+    in_dir, out_dir = _tree(tmpdir)
+    shutil.copy(path_from_file(__file__, "./models_in/empty.stp"), in_dir)
+    assert main(["convert", in_dir, out_dir, "--to", "brep", "--workers", "1"]) == 1
@@ -5,7 +5,7 @@ r"""DAT file reading tests"""
 
 import logging
 
-from OCCDataExchange.dat import DatImporter
+from OCCDataExchange.dat import DatImporter, iter_dat_chunks
 from OCCDataExchange.utils import path_from_file
 
 logging.basicConfig(level=logging.DEBUG,
@@ -18,3 +18,43 @@ def test_read_dat_file():
                                                skip_first_line=True)
     pts = importer.points
     assert len(pts) == 35
+
+
+def test_read_dat_file_lazy():
+    r"""In lazy mode, the file is only read on first access to the points"""
+    importer = DatImporter(path_from_file(__file__, "./models_in/naca0006.dat"),
+                           skip_first_line=True, lazy=True)
+    assert len(importer.points) == 35
+    assert len(importer.points) == 35
+
+
+def test_read_dat_file_array():
+    r"""Points as a contiguous array"""
+    importer = DatImporter(path_from_file(__file__, "./models_in/naca0006.dat"), as_3d=True)
+    assert importer.array.shape == (35, 3)
+    assert importer.points[0] == (1.0, 0.00063, 0.0)
+    assert len(importer.sections) == 1
+
+
+def test_read_dat_file_sections(tmpdir):
+    r"""Whitespace, comments and multiple sections"""
+    dat_file = tmpdir.join("sections.dat")
+    dat_file.write("# two sections\n"
+                   "upper\n"
+                   "1.0   0.0\n"
+                   "# comment lines are ignored\n"
+                   "\t0.5\t0.1  # trailing comment\n"
+                   "\n"
+                   "lower\n"
+                   "-.5 -1e-1\n")
+    importer = DatImporter(str(dat_file))
+    assert importer.array.shape == (3, 2)
+    assert [len(section) for section in importer.sections] == [2, 1]
+    assert importer.points[2] == (-0.5, -0.1)
+
+
+def test_iter_dat_chunks():
+    r"""Chunked read of a dat file"""
+    chunks = list(iter_dat_chunks(path_from_file(__file__, "./models_in/naca0006.dat"),
+                                  chunk_size=10, skip_first_line=True))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 10, 5]
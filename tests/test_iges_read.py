@@ -64,3 +64,13 @@ def test_iges_importer_2_boxes():
     topo = Topo(importer.compound)
     assert topo.number_of_faces() == 6 * 2
     assert topo.number_of_edges() == 24 * 2
+
+
+def test_iges_importer_selected_roots():
+    r"""Only the selected roots are transferred"""
+    filename = path_from_file(__file__, "./models_in/box.igs")
+    roots = IgesImporter(filename, lazy=True).list_roots()
+    assert len(roots) > 1
+    importer = IgesImporter(filename, roots=[roots[0].index])
+    assert len(importer.shapes) == 1
+    assert len(IgesImporter(filename, roots=lambda root: False).shapes) == 0
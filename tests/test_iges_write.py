@@ -128,3 +128,17 @@ def test_iges_exporter_overwrite(box_shape):
     importer = IgesImporter(filename)
     topo_compound = Topo(importer.compound)
     assert topo_compound.number_of_faces() == 6  # 6 from box
+
+
+def test_iges_exporter_deduplicate(box_shape):
+    r"""A shape added twice is written once"""
+    filename = path_from_file(__file__, "./models_out/box.igs")
+    exporter = IgesExporter(filename, deduplicate=True)
+    exporter.add_shape(box_shape)
+    exporter.add_shape(box_shape)
+    exporter.write_file()
+    assert exporter.stats.counters["duplicates"] == 1
+    assert exporter.stats.counters["shapes"] == 1
+
+    importer = IgesImporter(filename)
+    assert len([i for i in Topo(importer.compound).faces()]) == 6
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""lazy.py module tests"""
+
+import subprocess
+import sys
+
+import pytest
+
+from OCCDataExchange.lazy import lazy_import
+from OCCDataExchange.utils import path_from_file
+
+
+def test_lazy_import():
+    r"""The module is imported on first attribute access"""
+    json_module = lazy_import("json")
+    assert "not loaded" in repr(json_module)
+    assert json_module.loads("[1, 2]") == [1, 2]
+    assert "(loaded)" in repr(json_module)
+
+
+def test_lazy_import_missing_module():
+    r"""A missing module is only reported on first attribute access"""
+    missing = lazy_import("OCCDataExchange.nonexistent")
+    with pytest.raises(ImportError):
+        missing.anything
+
+
+@pytest.mark.parametrize("module", ["OCCDataExchange", "OCCDataExchange.step", "OCCDataExchange.iges",
+                                    "OCCDataExchange.stl", "OCCDataExchange.brep", "OCCDataExchange.step_ocaf",
+                                    "OCCDataExchange.dat", "OCCDataExchange.utils", "OCCDataExchange.cli"])
+def test_import_does_not_load_occ(module):
+    r"""Importing the modules of the package does not load OCC, OCCUtils or numpy"""
+    script = ("import sys; import %s; "
+              "print(sorted(m for m in sys.modules if m.split('.')[0] in ('OCC', 'OCCUtils', 'numpy')))" % module)
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=path_from_file(__file__, ".."))
+    assert output.decode("utf-8").strip() == "[]"
+
+
+@pytest.mark.parametrize("module, importer, filename", [("OCCDataExchange.step", "StepImporter", "box_203.stp"),
+                                                        ("OCCDataExchange.iges", "IgesImporter", "box.igs")])
+def test_import_file_through_lazy_modules(module, importer, filename):
+    r"""Read a file in a fresh interpreter, where every OCC and OCCUtils module is loaded through lazy_import()"""
+    pytest.importorskip("OCC")
+    script = ("import %s as m; importer = m.%s(%r); print(len(importer.shapes))"
+              % (module, importer, path_from_file(__file__, "./models_in/%s" % filename)))
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=path_from_file(__file__, ".."))
+    assert output.decode("utf-8").strip().splitlines()[-1] == "1"
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""scan.py module tests"""
+
+import pytest
+
+from OCCDataExchange.scan import scan_iges, scan_step, step_schema
+from OCCDataExchange.utils import path_from_file
+
+
+def test_step_schema():
+    r"""Application protocol from the FILE_SCHEMA schema names"""
+    assert step_schema("CONFIG_CONTROL_DESIGN") == "AP203"
+    assert step_schema("AUTOMOTIVE_DESIGN { 1 0 10303 214 1 1 1 1 }") == "AP214"
+    assert step_schema("AP242_MANAGED_MODEL_BASED_3D_ENGINEERING_MIM_LF { 1 0 10303 442 1 1 4 }") == "AP242"
+    assert step_schema("IFC2X3") is None
+
+
+def test_scan_step_203():
+    r"""Scan of an AP203 file"""
+    scan = scan_step(path_from_file(__file__, "./models_in/box_203.stp"))
+    assert scan.schema == "AP203"
+    assert scan.name == "box_203"
+    assert scan.product_names == ["Document"]
+    assert scan.entity_counts["CARTESIAN_POINT"] == 57
+    assert scan.nb_entities == 231
+
+
+def test_scan_step_214():
+    r"""Scan of an AP214 file"""
+    scan = scan_step(path_from_file(__file__, "./models_in/2_boxes_214.stp"))
+    assert scan.schema == "AP214"
+    assert scan.entity_counts["EDGE_CURVE"] == 24
+    assert scan.nb_entities == sum(scan.entity_counts.values())
+
+
+def test_scan_step_wrong_file_content():
+    r"""A file without HEADER section"""
+    with pytest.raises(ValueError):
+        scan_step(path_from_file(__file__, "./models_in/empty.stp"))
+
+
+def test_scan_step_wrong_extension():
+    r"""Scanning an IGES file as STEP"""
+    with pytest.raises(AssertionError):
+        scan_step(path_from_file(__file__, "./models_in/box.igs"))
+
+
+def test_scan_iges():
+    r"""Scan of an IGES file"""
+    scan = scan_iges(path_from_file(__file__, "./models_in/box.igs"))
+    assert scan.version == "5.2"
+    assert scan.version_flag == 10
+    assert scan.units == "MM"
+    assert scan.unit_flag == 2
+    assert scan.system == "Rhinoceros ( Jan 18 2007 )"
+    assert scan.entity_counts == {314: 6, 406: 6, 128: 6}
+    assert scan.nb_entities == 18
+    # the 6 faces of the box, the colors and level definitions are not geometry entities
+    assert [root.entity_type for root in scan.roots] == [128] * 6
+    assert scan.roots[0].number == 25
+
+
+def test_scan_iges_hollerith_across_lines():
+    r"""Global section strings spanning several lines"""
+    scan = scan_iges(path_from_file(__file__, "./models_in/aube_pleine.iges"))
+    assert scan.version == "5.3"
+    assert scan.system == "IBM CATIA IGES - CATIA Version 5 Release 17 "
+    assert len(scan.roots) == 13
+
+
+def test_scan_iges_wrong_file_content():
+    r"""A file without Global section"""
+    with pytest.raises(ValueError):
+        scan_iges(path_from_file(__file__, "./models_in/empty.igs"))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""sessions.py module tests"""
+
+import os
+import threading
+
+import pytest
+
+from OCCDataExchange.sessions import IgesWriterSession, StepWriterSession
+
+
+def test_wrong_parameters():
+    r"""Unsupported STEP schema and IGES format"""
+    with pytest.raises(AssertionError):
+        StepWriterSession(schema="48.3")
+    with pytest.raises(ValueError):
+        IgesWriterSession(format="48.3")
+
+
+def test_session_parameters():
+    r"""Interface_Static parameters of the sessions"""
+    assert StepWriterSession(schema="AP203", tolerance=1e-4).parameters == {"write.step.schema": "AP203"}
+    assert IgesWriterSession(format="5.3").parameters == {}
+    assert IgesWriterSession(format="5.3").brep_mode is True
+
+
+def test_concurrent_exports_with_different_schemas(tmpdir):
+    r"""Exports with different schemas from several threads"""
+    from OCC import BRepPrimAPI
+
+    from OCCDataExchange.scan import scan_step
+    from OCCDataExchange.step import StepExporter
+
+    box = BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+    filenames = dict((schema, [os.path.join(str(tmpdir), "box_%s_%i.stp" % (schema, i)) for i in range(4)])
+                     for schema in ["AP203", "AP214CD"])
+
+    def export(schema, filename):
+        exporter = StepExporter(filename, schema=schema)
+        exporter.add_shape(box)
+        exporter.write_file()
+
+    threads = [threading.Thread(target=export, args=(schema, filename))
+               for schema in filenames for filename in filenames[schema]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for filename in filenames["AP203"]:
+        assert scan_step(filename).schema == "AP203"
+    for filename in filenames["AP214CD"]:
+        assert scan_step(filename).schema == "AP214"
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""stats.py module tests"""
+
+import pytest
+
+from OCCDataExchange import stats as stats_module
+from OCCDataExchange.dat import DatImporter
+from OCCDataExchange.stats import ConversionStats, register_stats_hook, set_memory_profiling, unregister_stats_hook
+from OCCDataExchange.step import StepImporter
+from OCCDataExchange.utils import path_from_file
+
+
+def test_conversion_stats():
+    r"""Phases durations add up, counters are incremented"""
+    stats = ConversionStats("Dummy", "dummy.stp")
+    with stats.phase("read"):
+        pass
+    with stats.phase("read"):
+        pass
+    stats.count("shapes")
+    stats.count("shapes", 2)
+    assert stats.durations["read"] >= 0.
+    assert stats.counters["shapes"] == 3
+    assert stats.as_dict()["filename"] == "dummy.stp"
+
+
+def test_stats_hook():
+    r"""Registered hooks are called with the stats of every file read"""
+    reported = list()
+    register_stats_hook(reported.append)
+    try:
+        importer = DatImporter(path_from_file(__file__, "./models_in/naca0006.dat"), skip_first_line=True)
+    finally:
+        unregister_stats_hook(reported.append)
+    assert reported == [importer.stats]
+    assert importer.stats.counters["points"] == 35
+    assert "read" in importer.stats.durations
+
+
+def test_stats_hook_failure():
+    r"""A failing hook does not break the import"""
+    def failing_hook(stats):
+        raise RuntimeError("hook failure")
+    register_stats_hook(failing_hook)
+    try:
+        DatImporter(path_from_file(__file__, "./models_in/naca0006.dat"))
+    finally:
+        unregister_stats_hook(failing_hook)
+
+
+def test_step_importer_stats():
+    r"""Phases and counters of a STEP import"""
+    importer = StepImporter(path_from_file(__file__, "./models_in/box_203.stp"))
+    importer.compound
+    for phase in ["read", "check", "transfer", "compound"]:
+        assert phase in importer.stats.durations
+    assert importer.stats.counters["roots"] == 1
+    assert importer.stats.counters["shapes"] == 1
+    assert importer.stats.counters["bytes_read"] > 0
+
+
+def test_memory_profiling():
+    r"""RSS and Python allocations are measured per phase when profiling is enabled"""
+    stats = ConversionStats("Dummy", "dummy.stp")
+    assert stats.profile_memory is False
+    stats.profile_memory = True
+    with stats.phase("transfer"):
+        data = [0] * 1000000
+    del data
+    memory = stats.memory["transfer"]
+    assert memory["rss_peak"] > 0
+    if memory["py_peak"] is not None:
+        assert memory["py_peak"] >= 8 * 1000000
+
+
+def test_set_memory_profiling():
+    r"""The global switch applies to the importers created afterwards"""
+    set_memory_profiling(True)
+    try:
+        importer = DatImporter(path_from_file(__file__, "./models_in/naca0006.dat"))
+    finally:
+        set_memory_profiling(False)
+    assert "read" in importer.stats.memory
+    assert "read" in importer.stats.as_dict()["memory"]
+
+
+def test_memory_profiling_nested_phase():
+    r"""A phase nested in a profiled phase is only timed"""
+    stats = ConversionStats("Dummy", "dummy.stp")
+    stats.profile_memory = True
+    with stats.phase("transfer"):
+        with stats.phase("root"):
+            pass
+    assert "transfer" in stats.memory
+    assert "root" not in stats.memory
+    assert "root" in stats.durations
+
+
+def test_memory_profiling_already_tracing():
+    r"""py_peak is relative to the memory traced before the phase"""
+    tracemalloc = pytest.importorskip("tracemalloc")
+    tracemalloc.start()
+    try:
+        ballast = [0] * 2000000
+        stats = ConversionStats("Dummy", "dummy.stp")
+        stats.profile_memory = True
+        with stats.phase("transfer"):
+            pass
+        del ballast
+    finally:
+        tracemalloc.stop()
+    assert stats.memory["transfer"]["py_peak"] < 8 * 1000000
+
+
+def test_memory_profiling_peak_rss_only(monkeypatch):
+    r"""rss_delta is None when only the peak RSS of the process can be measured"""
+    monkeypatch.setattr(stats_module, "_read_rss", lambda: (1024, False))
+    stats = ConversionStats("Dummy", "dummy.stp")
+    stats.profile_memory = True
+    with stats.phase("transfer"):
+        pass
+    assert stats.memory["transfer"]["rss_delta"] is None
+    assert stats.memory["transfer"]["rss_peak"] == 1024
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""step_ocaf.py module tests"""
+
+import os
+
+import numpy as np
+import pytest
+from OCC import BRepPrimAPI
+from OCC import Quantity
+from OCC import gp
+
+from OCCDataExchange.step_ocaf import OcafTable, StepOcafExporter, StepOcafImporter
+
+
+@pytest.fixture()
+def colored_file(tmpdir):
+    r"""STEP file with a red box on the 'red' layer and a green sphere on the 'green' layer"""
+    filename = os.path.join(str(tmpdir), "box_and_sphere.stp")
+    exporter = StepOcafExporter(filename)
+    exporter.set_color(r=1, g=0, b=0)
+    exporter.set_layer("red")
+    exporter.add_shape(BRepPrimAPI.BRepPrimAPI_MakeBox(50, 50, 50).Shape())
+    exporter.set_color(r=0, g=1, b=0)
+    exporter.set_layer("green")
+    exporter.add_shape(BRepPrimAPI.BRepPrimAPI_MakeSphere(20).Shape())
+    exporter.write_file()
+    return filename
+
+
+def test_step_ocaf_importer(colored_file):
+    r"""Each shape is imported once, with its color and layer"""
+    importer = StepOcafImporter(colored_file)
+    assert len(importer.shapes) == 2
+    assert len(importer.colors) == 2
+    assert importer.layers_str == ["red", "green"]
+    assert importer.colors[0].Red() == 1. and importer.colors[0].Green() == 0.
+
+
+def test_step_ocaf_importer_label_index(colored_file):
+    r"""Labels are indexed by entry, each label once"""
+    importer = StepOcafImporter(colored_file)
+    index = importer.label_index
+    assert importer.stats.counters["roots"] == len(index)
+    for entry, info in index.items():
+        assert info.entry == entry
+        assert entry.startswith("0:")
+    solids = [info for info in index.values() if info.color is not None]
+    assert len(solids) == 2
+    assert all(info.is_free for info in solids)
+
+
+def test_step_ocaf_importer_table(colored_file):
+    r"""Columnar metadata of the imported shapes"""
+    table = StepOcafImporter(colored_file).table
+    assert len(table) == 2
+    assert set(table.layer_names) >= {"red", "green"}
+    assert table.on_layer("green").tolist() == [False, True]
+    assert table.with_color(1., 0., 0.).tolist() == [True, False]
+    np.testing.assert_allclose(table.rgb[1], [0., 1., 0.])
+
+
+def test_ocaf_table():
+    r"""Vectorized filtering by layer and color"""
+    table = OcafTable(rgb=np.array([[1., 0., 0.], [np.nan, np.nan, np.nan], [0., 1., 0.]]),
+                      layer_names=["red", "green"],
+                      layer_offsets=np.array([0, 1, 1, 3]),
+                      layer_ids=np.array([0, 1, 0]),
+                      names=["a", None, "c"],
+                      entries=["0:1:1:1", "0:1:1:2", "0:1:1:3"])
+    assert table.shape_ids.tolist() == [0, 1, 2]
+    assert table.on_layer("red").tolist() == [True, False, True]
+    assert table.on_layer("blue").tolist() == [False, False, False]
+    assert table.with_color(0., 1., 0.).tolist() == [False, False, True]
+    assert table.layers_of(2) == ["green", "red"]
+    assert table.layers_of(1) == []
+
+
+def test_step_ocaf_importer_layer_names(colored_file):
+    r"""Layer names are decoded once, shapes refer to them by id"""
+    importer = StepOcafImporter(colored_file)
+    assert "red" in importer.layer_names and "green" in importer.layer_names
+    red_id = importer.layer_names.index("red")
+    assert importer.table.layer_ids_of(0).tolist() == [red_id]
+    assert any(info.layer_ids == (red_id,) for info in importer.label_index.values())
+    # computed once, callers get a copy
+    layers_str = importer.layers_str
+    layers_str.append("blue")
+    assert importer.layers_str == ["red", "green"]
+    assert importer.layers[0].GetObject().Length() == 1
+
+
+def test_step_ocaf_exporter_add_shapes(tmpdir):
+    r"""Bulk add with a color per shape and a single layer"""
+    filename = os.path.join(str(tmpdir), "boxes.stp")
+    exporter = StepOcafExporter(filename)
+    boxes = [BRepPrimAPI.BRepPrimAPI_MakeBox(10. + i, 10., 10.).Shape() for i in range(4)]
+    exporter.add_shapes(boxes,
+                        colors=np.array([[1., 0., 0.], [0., 1., 0.], [1., 0., 0.], [0., 1., 0.]]),
+                        layers="boxes")
+    assert exporter.stats.counters["shapes"] == 4
+    exporter.write_file()
+
+    importer = StepOcafImporter(filename)
+    assert len(importer.shapes) == 4
+    # the 2 distinct colors
+    assert len(np.unique(importer.table.rgb, axis=0)) == 2
+    assert importer.table.with_color(1., 0., 0.).tolist() == [True, False, True, False]
+    assert importer.table.on_layer("boxes").all()
+
+
+def test_step_ocaf_exporter_add_shapes_single_color_and_layer(tmpdir):
+    r"""A single Quantity_Color and a unicode layer name apply to all the shapes"""
+    filename = os.path.join(str(tmpdir), "boxes.stp")
+    exporter = StepOcafExporter(filename)
+    boxes = [BRepPrimAPI.BRepPrimAPI_MakeBox(10. + i, 10., 10.).Shape() for i in range(5)]
+    exporter.add_shapes(boxes, colors=Quantity.Quantity_Color(0., 1., 0., Quantity.Quantity_TOC_RGB), layers=u"boxes")
+    exporter.write_file()
+
+    importer = StepOcafImporter(filename)
+    assert importer.table.with_color(0., 1., 0.).all()
+    assert importer.layers_str == ["boxes"] * 5
+
+
+def test_step_ocaf_exporter_add_shapes_wrong_number_of_colors(tmpdir):
+    r"""The number of colors does not match the number of shapes"""
+    exporter = StepOcafExporter(os.path.join(str(tmpdir), "boxes.stp"))
+    boxes = [BRepPrimAPI.BRepPrimAPI_MakeBox(10., 10., 10.).Shape() for _ in range(3)]
+    with pytest.raises(ValueError):
+        exporter.add_shapes(boxes, colors=[(1., 0., 0.), (0., 1., 0.)])
+
+
+def _translation(dx, dy=0.):
+    r"""Translation in the XY plane"""
+    trsf = gp.gp_Trsf()
+    trsf.SetTranslation(gp.gp_Vec(dx, dy, 0.))
+    return trsf
+
+
+def test_step_ocaf_exporter_assembly(tmpdir):
+    r"""Nested assemblies of instances of a single part"""
+    filename = os.path.join(str(tmpdir), "assembly.stp")
+    exporter = StepOcafExporter(filename)
+    box = exporter.add_part(BRepPrimAPI.BRepPrimAPI_MakeBox(10., 10., 10.).Shape(), color=(0., 0., 1.), name="box")
+    row = exporter.new_assembly(name="row")
+    for i in range(5):
+        exporter.add_instance(row, box, _translation(20. * i))
+    root = exporter.new_assembly(name="grid")
+    for j in range(4):
+        exporter.add_instance(root, row, _translation(0., 20. * j))
+    exporter.write_file()
+    assert exporter.stats.counters["parts"] == 1
+    assert exporter.stats.counters["assemblies"] == 2
+    assert exporter.stats.counters["components"] == 9
+
+    importer = StepOcafImporter(filename)
+    # 20 located instances, the part itself is not imported as a separate shape
+    assert len(importer.shapes) == 20
+    assert importer.table.with_color(0., 0., 1.).all()
+
+    # the geometry is written once : the file is much smaller than with 20 copies
+    filename_copies = os.path.join(str(tmpdir), "copies.stp")
+    exporter = StepOcafExporter(filename_copies)
+    exporter.add_shapes([BRepPrimAPI.BRepPrimAPI_MakeBox(gp.gp_Pnt(20. * i, 20. * j, 0.), 10., 10., 10.).Shape()
+                         for i in range(5) for j in range(4)])
+    exporter.write_file()
+    assert os.path.getsize(filename) < os.path.getsize(filename_copies) / 2
+
+
+def test_step_ocaf_importer_assembly_colors(tmpdir):
+    r"""The instances of an assembly get the color and layer of their part"""
+    filename = os.path.join(str(tmpdir), "red_and_blue.stp")
+    exporter = StepOcafExporter(filename)
+    red = exporter.add_part(BRepPrimAPI.BRepPrimAPI_MakeBox(10., 10., 10.).Shape(), color=(1., 0., 0.), layer="red")
+    blue = exporter.add_part(BRepPrimAPI.BRepPrimAPI_MakeSphere(5.).Shape(), color=(0., 0., 1.), layer="blue")
+    row = exporter.new_assembly(name="row")
+    exporter.add_instance(row, red, _translation(0.))
+    exporter.add_instance(row, blue, _translation(20.))
+    exporter.add_instance(row, red, _translation(40.))
+    root = exporter.new_assembly(name="rows")
+    exporter.add_instance(root, row, _translation(0., 0.))
+    exporter.add_instance(root, row, _translation(0., 20.))
+    exporter.write_file()
+
+    importer = StepOcafImporter(filename)
+    table = importer.table
+    assert len(importer.shapes) == 6
+    assert table.with_color(1., 0., 0.).sum() == 4
+    assert table.with_color(0., 0., 1.).sum() == 2
+    assert (table.with_color(1., 0., 0.) == table.on_layer("red")).all()
+    assert (table.with_color(0., 0., 1.) == table.on_layer("blue")).all()
+    # the locations of the nested components are composed
+    translations = [shape.Location().Transformation().TranslationPart() for shape in importer.shapes]
+    assert sorted((round(t.X(), 6), round(t.Y(), 6)) for t in translations) == [(0., 0.), (0., 20.), (20., 0.),
+                                                                                 (20., 20.), (40., 0.), (40., 20.)]
+
+
+def test_step_ocaf_importer_no_color(tmpdir):
+    r"""A shape without color gets None, not the default (yellow) Quantity_Color"""
+    filename = os.path.join(str(tmpdir), "no_color.stp")
+    exporter = StepOcafExporter(filename)
+    exporter.shape_tool.AddShape(BRepPrimAPI.BRepPrimAPI_MakeBox(10., 10., 10.).Shape())
+    exporter.write_file()
+
+    importer = StepOcafImporter(filename)
+    assert importer.colors == [None]
+    assert np.isnan(importer.table.rgb[0]).all()
@@ -72,3 +72,53 @@ def test_step_importer_2_boxes():
     assert topo.number_of_comp_solids() == 0
     assert topo.number_of_solids() == 2
     assert topo.number_of_shells() == 2
+
+
+def test_step_importer_lazy():
+    r"""In lazy mode, the file is only read on first access to the shapes"""
+    importer = StepImporter(path_from_file(__file__, "./models_in/empty.stp"), lazy=True)
+    with pytest.raises(ValueError):
+        importer.shapes
+
+    importer = StepImporter(path_from_file(__file__, "./models_in/box_203.stp"), lazy=True)
+    assert len(importer.shapes) == 1
+    assert isinstance(importer.compound, TopoDS.TopoDS_Compound)
+    assert len(importer.shapes) == 1
+
+
+def test_step_importer_lazy_wrong_path():
+    r"""The filename is checked even in lazy mode"""
+    with pytest.raises(AssertionError):
+        StepImporter("C:/stupid-filename.bad_extension", lazy=True)
+
+
+def test_step_importer_list_roots():
+    r"""List the roots of a STEP file without transferring them"""
+    importer = StepImporter(path_from_file(__file__, "./models_in/box_203.stp"), lazy=True)
+    roots = importer.list_roots()
+    assert len(roots) == 1
+    assert roots[0].index == 1
+    assert roots[0].entity_type == "StepBasic_ProductDefinition"
+    assert len(importer.shapes) == 1
+
+
+def test_step_importer_selected_roots():
+    r"""Only the selected roots are transferred"""
+    filename = path_from_file(__file__, "./models_in/box_203.stp")
+    assert len(StepImporter(filename, roots=[1]).shapes) == 1
+    assert len(StepImporter(filename, roots=lambda root: False).shapes) == 0
+    with pytest.raises(ValueError):
+        StepImporter(filename, roots=[2])
+
+
+def test_step_importer_compound_memoized():
+    r"""The compound is only rebuilt when the shapes list changes"""
+    importer = StepImporter(path_from_file(__file__, "./models_in/box_203.stp"))
+    compound = importer.compound
+    assert importer.compound is compound
+    assert list(importer.iter_shapes()) == importer.shapes
+
+    importer.shapes.append(importer.shapes[0])
+    assert importer.compound is not compound
+    topo = Topo(importer.compound)
+    assert topo.number_of_solids() == 2
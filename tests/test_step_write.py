@@ -134,3 +134,55 @@ def test_step_exporter_overwrite(box_shape):
     importer = StepImporter(filename)
     assert len([i for i in Topo(importer.compound).faces()]) == 6  # 6 from box
     assert len([i for i in Topo(importer.compound).solids()]) == 1
+
+
+def _moved(a_shape, dx):
+    r"""Partner of a_shape translated by dx along x"""
+    from OCC import TopLoc
+
+    trsf = gp.gp_Trsf()
+    trsf.SetTranslation(gp.gp_Vec(dx, 0, 0))
+    return a_shape.Moved(TopLoc.TopLoc_Location(trsf))
+
+
+def test_step_exporter_deduplicate(box_shape):
+    r"""A shape added twice is written once, partner shapes share their geometry"""
+    filename = path_from_file(__file__, "./models_out/boxes.stp")
+    exporter = StepExporter(filename, deduplicate=True)
+    exporter.add_shape(box_shape)
+    exporter.add_shape(box_shape)
+    for i in range(1, 10):
+        exporter.add_shape(_moved(box_shape, 20 * i))
+    exporter.write_file()
+    assert exporter.stats.counters["duplicates"] == 1
+    assert exporter.stats.counters["instances"] == 10
+    deduplicated_size = os.path.getsize(filename)
+
+    importer = StepImporter(filename)
+    assert len([i for i in Topo(importer.compound).solids()]) == 10
+
+    filename = path_from_file(__file__, "./models_out/boxes_copies.stp")
+    exporter = StepExporter(filename)
+    for i in range(10):
+        exporter.add_shape(_moved(box_shape, 20 * i))
+    exporter.write_file()
+    assert deduplicated_size < os.path.getsize(filename)
+
+
+def test_step_exporter_deduplicate_roots(box_shape):
+    r"""One root per group of partner shapes, in the order of their first shape"""
+    filename = path_from_file(__file__, "./models_out/box_and_sphere.stp")
+    exporter = StepExporter(filename, deduplicate=True)
+    exporter.add_shape(box_shape)
+    exporter.add_shape(BRepPrimAPI.BRepPrimAPI_MakeSphere(10).Shape())
+    exporter.add_shape(_moved(box_shape, 50))
+    exporter.add_shape(box_shape.Reversed())  # not a duplicate
+    exporter.write_file()
+    assert "duplicates" not in exporter.stats.counters
+    assert exporter.stats.counters["instances"] == 3
+    assert exporter.stats.counters["shapes"] == 2
+
+    importer = StepImporter(filename)
+    assert len(importer.shapes) == 2
+    assert len([i for i in Topo(importer.shapes[0]).solids()]) == 3
+    assert len([i for i in Topo(importer.shapes[1]).solids()]) == 1
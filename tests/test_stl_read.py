@@ -9,7 +9,7 @@ import pytest
 from OCC import TopoDS
 from OCCUtils import Topo
 
-from OCCDataExchange.stl import StlImporter
+from OCCDataExchange.stl import StlImporter, read_stl_mesh
 from OCCDataExchange.utils import path_from_file
 
 logging.basicConfig(level=logging.DEBUG,
@@ -93,3 +93,37 @@ def test_stl_importer_2_boxes():
     assert topo.number_of_edges() == 162 * 2
 
 
+@pytest.mark.parametrize("filename", ["box_binary.stl", "box_ascii.stl"])
+def test_read_stl_mesh(filename):
+    r"""Read a STL file into arrays"""
+    mesh = read_stl_mesh(path_from_file(__file__, "./models_in/%s" % filename))
+    assert mesh.nb_triangles == 108
+    assert mesh.faces.shape == (108, 3)
+    assert mesh.normals.shape == (108, 3)
+    assert mesh.vertices.shape[1] == 3
+    assert mesh.faces.max() < len(mesh.vertices)
+
+
+def test_read_stl_mesh_mmap():
+    r"""Memory mapped read of a binary STL file"""
+    mesh = read_stl_mesh(path_from_file(__file__, "./models_in/2_boxes_binary.stl"), mmap=True)
+    assert mesh.nb_triangles == 108 * 2
+    # the vertices are not merged by default, they stay a view of the memory mapped file
+    assert mesh.vertices.shape == (108 * 2 * 3, 3)
+    merged = read_stl_mesh(path_from_file(__file__, "./models_in/2_boxes_binary.stl"), mmap=True, merge_vertices=True)
+    assert len(merged.vertices) < len(mesh.vertices)
+
+
+def test_read_stl_mesh_empty():
+    r"""A STL file without triangles"""
+    with pytest.raises(ValueError):
+        read_stl_mesh(path_from_file(__file__, "./models_in/empty.stl"))
+
+
+def test_stl_importer_mesh_mode():
+    r"""The shape is built from the mesh on demand"""
+    importer = StlImporter(path_from_file(__file__, "./models_in/box_binary.stl"), mesh=True)
+    assert importer.mesh.nb_triangles == 108
+    topo = Topo(importer.shape)
+    assert len([i for i in topo.shells()]) == 1
+    assert len([i for i in topo.faces()]) == 108
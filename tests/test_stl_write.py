@@ -14,7 +14,7 @@ from OCC import TopoDS
 from OCCUtils import Topo
 from OCCUtils.types_lut import ShapeToTopology
 
-from OCCDataExchange.stl import StlExporter, StlImporter
+from OCCDataExchange.stl import StlExporter, StlImporter, read_stl_mesh, shape_triangulation
 from OCCDataExchange.utils import path_from_file
 
 logging.basicConfig(level=logging.DEBUG,
@@ -125,3 +125,35 @@ def test_stl_exporter_overwrite(box_shape):
     importer = StlImporter(filename)
     topo = Topo(importer.shape)
     assert topo.number_of_shells() == 1
+
+
+def test_stl_exporter_mesh():
+    r"""Write a mesh given as arrays"""
+    mesh = read_stl_mesh(path_from_file(__file__, "./models_in/box_ascii.stl"))
+    filename = path_from_file(__file__, "./models_out/box_mesh.stl")
+    exporter = StlExporter(filename)
+    exporter.set_mesh(mesh.vertices, mesh.faces)
+    exporter.write_file()
+    assert os.path.getsize(filename) == 84 + 50 * 108
+    assert read_stl_mesh(filename).nb_triangles == 108
+
+
+def test_stl_exporter_mesh_ascii():
+    r"""Meshes can only be written in binary mode"""
+    filename = path_from_file(__file__, "./models_out/box_mesh.stl")
+    exporter = StlExporter(filename, ascii_mode=True)
+    with pytest.raises(ValueError):
+        exporter.set_mesh([[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 1, 2]])
+
+
+def test_stl_exporter_from_triangulation(box_shape):
+    r"""Write the triangulation of a shape"""
+    vertices, faces = shape_triangulation(box_shape)
+    assert len(faces) == 12  # 6 planar faces, 2 triangles each
+    filename = path_from_file(__file__, "./models_out/box_triangulation.stl")
+    exporter = StlExporter(filename, from_triangulation=True)
+    exporter.set_shape(box_shape)
+    exporter.write_file()
+    mesh = read_stl_mesh(filename)
+    assert mesh.nb_triangles == 12
+    assert len(mesh.vertices) == 8
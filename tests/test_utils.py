@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+r"""utils.py module tests"""
+
+import os
+
+import pytest
+from OCC import BRepPrimAPI
+from OCC import TopAbs
+from OCC import TopoDS
+
+from OCCDataExchange import utils
+from OCCDataExchange.cache import TessellationCache
+from OCCDataExchange.utils import files_to_shapes, path_from_file, shape_to_file
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_files_to_shapes(workers):
+    r"""Batch import of files of different formats"""
+    paths = [path_from_file(__file__, "./models_in/box_203.stp"),
+             path_from_file(__file__, "./models_in/box.igs"),
+             path_from_file(__file__, "./models_in/box_binary.stl")]
+    results = list(files_to_shapes(paths, workers=workers))
+    assert sorted(r.path for r in results) == sorted(paths)
+    for result in results:
+        assert result.error is None
+        assert result.elapsed >= 0.
+        for shape in result.shapes:
+            assert isinstance(shape, TopoDS.TopoDS_Shape)
+    step_result = [r for r in results if r.path == paths[0]][0]
+    assert step_result.shapes[0].ShapeType() == TopAbs.TopAbs_SOLID
+
+
+def test_files_to_shapes_error():
+    r"""A file that cannot be imported is reported, not raised"""
+    paths = [path_from_file(__file__, "./models_in/empty.stp"),
+             path_from_file(__file__, "./models_in/box_203.stp")]
+    results = {r.path: r for r in files_to_shapes(paths, workers=2)}
+    assert results[paths[0]].shapes is None
+    assert "ValueError" in results[paths[0]].error
+    assert len(results[paths[1]].shapes) == 1
+
+
+def _crashing_import_worker(pth):
+    r"""Import worker whose process crashes"""
+    os._exit(1)
+
+
+def test_files_to_shapes_crashed_worker(monkeypatch):
+    r"""A crashed worker process fails the files, the batch is not aborted"""
+    monkeypatch.setattr(utils, "_import_worker", _crashing_import_worker)
+    paths = [path_from_file(__file__, "./models_in/box_203.stp"),
+             path_from_file(__file__, "./models_in/box.igs")]
+    results = list(files_to_shapes(paths, workers=2))
+    assert sorted(r.path for r in results) == sorted(paths)
+    for result in results:
+        assert result.shapes is None
+        assert "BrokenProcessPool" in result.error
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_shape_to_file_formats(tmpdir, workers):
+    r"""Multi-format export, the STL tessellation comes from the shared cache"""
+    box = BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+    cache = TessellationCache()
+    files = shape_to_file(box, str(tmpdir), "box", formats=["step", "igs", "stl", "brep"],
+                          workers=workers, tessellation_cache=cache)
+    assert list(files.keys()) == ["step", "igs", "stl", "brep"]
+    assert list(files.values()) == [os.path.join(str(tmpdir), "box.%s" % ext) for ext in ["step", "igs", "stl", "brep"]]
+    for filename in files.values():
+        assert os.path.isfile(filename)
+    assert cache.stats["entries"] == 1
+
+    # the single file call uses the same STL writer
+    assert shape_to_file(box, str(tmpdir), "box_2", format="stl", tessellation_cache=cache) == \
+        os.path.join(str(tmpdir), "box_2.stl")
+    assert cache.stats["hits"] == 1
+
+
+def test_shape_to_file_wrong_format(tmpdir):
+    r"""A format that cannot be written"""
+    box = BRepPrimAPI.BRepPrimAPI_MakeBox(10, 20, 30).Shape()
+    with pytest.raises(AssertionError):
+        shape_to_file(box, str(tmpdir), "box", formats=["step", "obj"])